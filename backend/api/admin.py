@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from typing import Literal
+
+from models import database
+from models.database import get_db
+from models.pool import pool_snapshot, render_prometheus
+from utils.latency import latency_summary
+from utils.passwords import PASSWORD_WORKERS, PASSWORD_QUEUE_DEPTH
+from api.dependencies import get_current_lead
+from api.ledger import rebuild_all
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+)
+
+
+def get_current_admin(
+    lead=Depends(get_current_lead),
+):
+    if not lead.is_admin:
+        raise HTTPException(403, "Admin only")
+
+    return lead
+
+
+@router.get("/metrics/pool")
+def get_pool_metrics(
+    format: Literal["json", "prometheus"] = "json",
+    admin=Depends(get_current_admin),
+):
+    snapshot = pool_snapshot(database.engine)
+    async_snapshot = None
+    if database.async_engine is not None:
+        async_snapshot = pool_snapshot(database.async_engine.sync_engine)
+
+    if format == "prometheus":
+        text = render_prometheus(snapshot)
+        if async_snapshot is not None:
+            text += render_prometheus(async_snapshot, prefix="db_async_pool")
+        return PlainTextResponse(text)
+
+    if async_snapshot is not None:
+        snapshot["async_pool"] = async_snapshot
+
+    return snapshot
+
+
+@router.get("/metrics/latency")
+def get_latency_metrics(
+    admin=Depends(get_current_admin),
+):
+    return {
+        "password_workers": PASSWORD_WORKERS,
+        "password_queue_depth": PASSWORD_QUEUE_DEPTH,
+        **latency_summary(),
+    }
+
+
+@router.post("/ledger/rebuild")
+def rebuild_allowance_ledger(
+    db: Session = Depends(get_db),
+    admin=Depends(get_current_admin),
+):
+    # Reconciles the ledger after writes that bypass the API
+    slices = rebuild_all(db)
+    db.commit()
+
+    return {"status": "rebuilt", "slices": slices}
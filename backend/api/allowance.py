@@ -1,22 +1,48 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from datetime import date
-
-from models.database import get_db
+from sqlalchemy import and_, or_, case, func, literal_column
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Literal
+import os
+
+from models.database import get_db, SessionLocal
+from models.scan import scan
 from models.models import (
     Project,
     ProjectHoliday,
     ProjectEmployee,
-    ProjectLeadAssignment,
     ShiftAllocation,
     ProjectShiftMaster,
     Employee,
 )
+from models.schemas import ReportJobRequest
 from api.dependencies import(
     get_current_lead,
     get_project_or_403,
     get_holidays_map,
+    get_lead_project_ids,
+    get_data_version,
+    ShiftMasterIndex,
     )
+from utils.cache import TTLCache
+from utils.export import export_response
+from utils.jobs import DONE, FAILED, JobQueueFull, report_jobs
+from utils.http_cache import etag_matches, not_modified, request_etag
+from api.ledger import closed_months, ledger_groups, next_month
+from utils.allowance_engine import (
+    WEEKDAY,
+    WEEKEND,
+    HOLIDAY,
+    allowance_groups,
+    build_employee_rows,
+    classify_dates,
+    iter_classified,
+    shift_rate,
+    tally_allowances,
+)
 
 
 
@@ -26,214 +52,252 @@ router = APIRouter(
     dependencies=[Depends(get_current_lead)],
 )
 
+# Finished reports keyed by (report, scope, range, mode, data version). A
+# write in scope changes the version, so stale entries are never hit;
+# they are dropped when superseded or age out.
+_report_cache = TTLCache(
+    maxsize=int(os.getenv("REPORT_CACHE_SIZE", "128")),
+    ttl=float(os.getenv("REPORT_CACHE_TTL", "300")),
+)
 
 
-@router.get("/reports/employee-allowance")
-def employee_allowance_report(
-    project_id: int,
-    from_date: date,
-    to_date: date,
-    db: Session = Depends(get_db),
-    lead=Depends(get_current_lead),
-):
-    get_project_or_403(project_id, lead, db)
-
-    # Fetch active shifts
-    shifts = (
-        db.query(ProjectShiftMaster)
-        .filter(
-            ProjectShiftMaster.project_id == project_id,
-            ProjectShiftMaster.effective_from <= to_date,
-            (ProjectShiftMaster.effective_to.is_(None)) |
-            (ProjectShiftMaster.effective_to >= from_date),
-            ProjectShiftMaster.is_active == True,
-        )
-        .all()
-    )
+def _cache_report(cache_key, result):
+    scope = cache_key[:-1]
+    _report_cache.pop_where(lambda key: key[:-1] == scope)
+    _report_cache.set(cache_key, result)
 
-    shift_map = {s.shift_code: s for s in shifts}
 
-    # Fetch approved allocations
-    allocations = (
+def _approved_allocations(db: Session, project_ids, from_date: date, to_date: date):
+    """
+    Approved allocations in range, in the row shape and date order the
+    allowance engine expects.
+    """
+    return (
         db.query(
             ShiftAllocation.emp_id,
             Employee.emp_name,
             Employee.emp_lname,
             ShiftAllocation.shift_code,
             ShiftAllocation.shift_date,
+            ShiftAllocation.project_id,
         )
         .join(Employee)
         .filter(
-            ShiftAllocation.project_id == project_id,
+            ShiftAllocation.project_id.in_(project_ids),
             ShiftAllocation.shift_date.between(from_date, to_date),
             ShiftAllocation.is_approved == True,
         )
-        .all()
+        .order_by(ShiftAllocation.shift_date, ShiftAllocation.allocation_id)
     )
 
-    holidays = get_holidays_map(db, project_id, from_date, to_date)
-
-    report = {}
 
-    for emp_id, emp_name, emp_lname, shift_code, shift_date in allocations:
+def _is_weekend_sql(db: Session, column):
+    """Saturday/Sunday test for a DATE column on the bound dialect."""
+    dialect = db.get_bind().dialect.name
 
-        shift = shift_map.get(shift_code)
-        if not shift:
-            continue
-
-        emp = report.setdefault(emp_id, {
-            "emp_id": emp_id,
-            "emp_name": emp_name,
-            "emp_lname": emp_lname,
-            "shift_counts": {},
-            "weekend_shift_count": 0,
-            "holiday_shift_count": 0,
-            "total_allowance": 0,
-        })
+    if dialect == "mysql":
+        # DAYOFWEEK: 1 = Sunday ... 7 = Saturday
+        return func.dayofweek(column).in_([1, 7])
 
-        is_weekend = shift_date.weekday() >= 5
-        is_holiday = shift_date.isoformat() in holidays
+    if dialect == "mssql":
+        # Normalised so the result does not depend on SET DATEFIRST:
+        # 0 = Saturday, 1 = Sunday
+        return (
+            (func.datepart(literal_column("weekday"), column)
+             + literal_column("@@DATEFIRST")) % 7
+        ).in_([0, 1])
 
-        if is_weekend or is_holiday:
-            allowance = float(shift.weekend_allowance)
+    if dialect == "sqlite":
+        return func.strftime("%w", column).in_(["0", "6"])
 
-            if is_weekend:
-                emp["weekend_shift_count"] += 1
-            elif is_holiday:
-                emp["holiday_shift_count"] += 1
-        else:
-            allowance = float(shift.weekday_allowance)
-            emp["shift_counts"][shift_code] = (
-                emp["shift_counts"].get(shift_code, 0) + 1
-            )
+    return func.extract("dow", column).in_([0, 6])
 
-        emp["total_allowance"] += allowance
 
-    return {
-        "shifts": [
-            {
-                "shift_code": s.shift_code,
-                "shift_name": s.shift_name,
-                "start_time": str(s.start_time),
-                "end_time": str(s.end_time),
-                "weekday_allowance": float(s.weekday_allowance),
-                "weekend_allowance": float(s.weekend_allowance),
-            }
-            for s in shifts
-        ],
-        "rows": list(report.values()),
-    }
-
-@router.get("/reports/employee-allowance/aggregate")
-def employee_allowance_report_aggregate(
+def _sql_allowance_groups(
+    db: Session,
+    project_ids,
     from_date: date,
     to_date: date,
-    db: Session = Depends(get_db),
-    lead=Depends(get_current_lead),
+    holiday_scope,
 ):
-    
-    if lead.is_admin:
-        project_ids = [
-            p.project_id for p in db.query(Project).filter(Project.is_active == True)
-        ]
-    else:
-        project_ids = [
-            pid for (pid,) in db.query(ProjectLeadAssignment.project_id)
-            .filter(ProjectLeadAssignment.lead_id == lead.lead_id)
-            .all()
-        ]
-    if not project_ids:
-        return {"shifts": [], "rows": []}
-
-    # 🔹 Fetch all active shift masters for these projects
-    shifts = (
-        db.query(ProjectShiftMaster)
+    """
+    Aggregate approved allocations in the database, returning (names,
+    groups) with one group per (emp_id, shift_code, day_type) instead of
+    one row per allocation.
+
+    Each allocation is priced with the shift master version effective on
+    its date. An employee working the same code on the same date in
+    several projects counts once, at the highest rate.
+    """
+    is_holiday = (
+        db.query(ProjectHoliday)
         .filter(
-            ProjectShiftMaster.project_id.in_(project_ids),
-            ProjectShiftMaster.effective_from <= to_date,
-            (ProjectShiftMaster.effective_to.is_(None)) |
-            (ProjectShiftMaster.effective_to >= from_date),
-            ProjectShiftMaster.is_active == True,
+            ProjectHoliday.holiday_date == ShiftAllocation.shift_date,
+            holiday_scope,
         )
-        .all()
+        .exists()
     )
 
-    # 🔹 Build shift_map with MAX allowance per shift_code
-    shift_map = {}
-
-    for s in shifts:
-        existing = shift_map.get(s.shift_code)
-        if not existing:
-            shift_map[s.shift_code] = s
-        else:
-            # Take higher allowances
-            if s.weekday_allowance > existing.weekday_allowance:
-                existing.weekday_allowance = s.weekday_allowance
-            if s.weekend_allowance > existing.weekend_allowance:
-                existing.weekend_allowance = s.weekend_allowance
-
-    # 🔹 Fetch all approved allocations across projects
-    allocations = (
+    priced = (
         db.query(
             ShiftAllocation.emp_id,
-            Employee.emp_name,
-            Employee.emp_lname,
             ShiftAllocation.shift_code,
             ShiftAllocation.shift_date,
+            case(
+                (_is_weekend_sql(db, ShiftAllocation.shift_date), WEEKEND),
+                (is_holiday, HOLIDAY),
+                else_=WEEKDAY,
+            ).label("day_type"),
+            ProjectShiftMaster.weekday_allowance,
+            ProjectShiftMaster.weekend_allowance,
+        )
+        .join(
+            ProjectShiftMaster,
+            and_(
+                ProjectShiftMaster.project_id == ShiftAllocation.project_id,
+                ProjectShiftMaster.shift_code == ShiftAllocation.shift_code,
+                ProjectShiftMaster.effective_from <= ShiftAllocation.shift_date,
+                or_(
+                    ProjectShiftMaster.effective_to.is_(None),
+                    ProjectShiftMaster.effective_to >= ShiftAllocation.shift_date,
+                ),
+                ProjectShiftMaster.is_active == True,
+            ),
         )
-        .join(Employee)
         .filter(
             ShiftAllocation.project_id.in_(project_ids),
             ShiftAllocation.shift_date.between(from_date, to_date),
             ShiftAllocation.is_approved == True,
         )
-        .all()
+        .subquery()
+    )
+
+    # One row per (emp, date, code) across projects
+    per_day = (
+        db.query(
+            priced.c.emp_id,
+            priced.c.shift_code,
+            priced.c.day_type,
+            func.max(priced.c.weekday_allowance).label("weekday_allowance"),
+            func.max(priced.c.weekend_allowance).label("weekend_allowance"),
+        )
+        .group_by(
+            priced.c.emp_id,
+            priced.c.shift_date,
+            priced.c.shift_code,
+            priced.c.day_type,
+        )
+        .subquery()
     )
 
-    # 🔹 Fetch holidays across projects
-    holidays = get_holidays_map(db, None, from_date, to_date)
+    rate = case(
+        (per_day.c.day_type == WEEKDAY, per_day.c.weekday_allowance),
+        else_=per_day.c.weekend_allowance,
+    )
 
-    report = {}
-    seen_shifts = set()   # 🔥 Deduplication set
+    groups = (
+        db.query(
+            per_day.c.emp_id,
+            Employee.emp_name,
+            Employee.emp_lname,
+            per_day.c.shift_code,
+            per_day.c.day_type,
+            func.count(),
+            func.sum(rate),
+        )
+        .join(Employee, Employee.emp_id == per_day.c.emp_id)
+        .group_by(
+            per_day.c.emp_id,
+            Employee.emp_name,
+            Employee.emp_lname,
+            per_day.c.shift_code,
+            per_day.c.day_type,
+        )
+        .order_by(per_day.c.emp_id, per_day.c.shift_code)
+        .all()
+    )
 
-    for emp_id, emp_name, emp_lname, shift_code, shift_date in allocations:
+    names = {}
+    for emp_id, emp_name, emp_lname, *_ in groups:
+        names.setdefault(emp_id, (emp_name, emp_lname))
 
-        unique_key = (emp_id, shift_date, shift_code)
-        if unique_key in seen_shifts:
-            continue
-        seen_shifts.add(unique_key)
+    return names, [
+        (emp_id, shift_code, day_type, count, Decimal(str(total or 0)))
+        for emp_id, _, _, shift_code, day_type, count, total in groups
+    ]
 
-        shift = shift_map.get(shift_code)
-        if not shift:
-            continue
 
-        emp = report.setdefault(emp_id, {
-            "emp_id": emp_id,
-            "emp_name": emp_name,
-            "emp_lname": emp_lname,
-            "shift_counts": {},
-            "weekend_shift_count": 0,
-            "holiday_shift_count": 0,
-            "total_allowance": 0,
-        })
+def _sql_allowance_rows(
+    db: Session,
+    project_ids,
+    from_date: date,
+    to_date: date,
+    holiday_scope,
+):
+    return build_employee_rows(
+        *_sql_allowance_groups(db, project_ids, from_date, to_date, holiday_scope)
+    )
 
-        is_weekend = shift_date.weekday() >= 5
-        is_holiday = shift_date.isoformat() in holidays
 
-        if is_weekend or is_holiday:
-            allowance = float(shift.weekend_allowance)
+def _project_report(
+    db: Session,
+    project_id: int,
+    from_date: date,
+    to_date: date,
+    mode: str = "python",
+):
+    # Fetch active shift versions overlapping the range
+    shift_index = ShiftMasterIndex.load(db, [project_id], from_date, to_date)
+    shifts = list(shift_index.versions())
+
+    # Closed full months come precomputed from the ledger; only the
+    # remaining head and tail of the range are aggregated live
+    names = {}
+    groups = []
+    live_ranges = [(from_date, to_date)]
+
+    closed = closed_months(from_date, to_date)
+    if closed:
+        first, last = closed
+        ledger_names, ledger_rows = ledger_groups(db, project_id, first, last)
+        names.update(ledger_names)
+        groups.extend(ledger_rows)
+        live_ranges = [
+            (start, end)
+            for start, end in (
+                (from_date, first - timedelta(days=1)),
+                (next_month(last), to_date),
+            )
+            if start <= end
+        ]
 
-            if is_weekend:
-                emp["weekend_shift_count"] += 1
-            else:
-                emp["holiday_shift_count"] += 1
+    for start, end in live_ranges:
+        if mode == "sql":
+            live_names, live_groups = _sql_allowance_groups(
+                db, [project_id], start, end,
+                or_(
+                    ProjectHoliday.project_id.is_(None),
+                    ProjectHoliday.project_id == project_id,
+                ),
+            )
         else:
-            allowance = float(shift.weekday_allowance)
-            emp["shift_counts"][shift_code] = (
-                emp["shift_counts"].get(shift_code, 0) + 1
+            # Fetch approved allocations
+            allocations = scan(
+                _approved_allocations(db, [project_id], start, end)
+            )
+
+            holidays = get_holidays_map(db, project_id, start, end)
+            day_types = classify_dates(start, end, holidays)
+
+            live_names, live_groups = allowance_groups(
+                allocations, day_types, shift_index.resolve
             )
 
-        emp["total_allowance"] += allowance
+        for emp_id, emp_names in live_names.items():
+            names.setdefault(emp_id, emp_names)
+        groups.extend(live_groups)
+
+    rows = build_employee_rows(names, groups)
 
     return {
         "shifts": [
@@ -245,89 +309,222 @@ def employee_allowance_report_aggregate(
                 "weekday_allowance": float(s.weekday_allowance),
                 "weekend_allowance": float(s.weekend_allowance),
             }
-            for s in shift_map.values()
+            for s in shifts
         ],
-        "rows": list(report.values()),
+        "rows": rows,
     }
 
 
-@router.get("/reports/employee-allowance/detailed")
-def employee_allowance_detailed(
+@router.get("/reports/employee-allowance")
+def employee_allowance_report(
+    request: Request,
+    response: Response,
+    project_id: int,
     from_date: date,
     to_date: date,
-    project_id: int | None = None,
-    emp_id: int | None = None,
+    mode: Literal["python", "sql"] = "python",
     db: Session = Depends(get_db),
     lead=Depends(get_current_lead),
 ):
+    get_project_or_403(project_id, lead, db)
 
-    # 🔹 Get accessible projects
-    if lead.is_admin:
-        project_ids = [
-            p.project_id for p in db.query(Project).all()
-        ]
-    else:
-        project_ids = [
-            pid for (pid,) in db.query(ProjectLeadAssignment.project_id)
-            .filter(ProjectLeadAssignment.lead_id == lead.lead_id)
-            .all()
-        ]
+    version = get_data_version(db, [project_id], from_date, to_date)
+    etag = request_etag(request, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
 
-    if project_id:
-        if project_id not in project_ids:
-            return {"summary": {}, "daily": []}
-        project_ids = [project_id]
+    # Same scope and data version means the same result, whoever asks
+    cache_key = ("project", project_id, from_date, to_date, mode, version)
+    result = _report_cache.get(cache_key)
 
-    if not project_ids:
-        return {"summary": {}, "daily": []}
+    if result is None:
+        result = _project_report(db, project_id, from_date, to_date, mode)
+        _cache_report(cache_key, result)
 
-    # 🔹 Fetch shift masters
-    shifts = (
-        db.query(ProjectShiftMaster)
-        .filter(
-            ProjectShiftMaster.project_id.in_(project_ids),
-            ProjectShiftMaster.effective_from <= to_date,
-            (ProjectShiftMaster.effective_to.is_(None)) |
-            (ProjectShiftMaster.effective_to >= from_date),
-            ProjectShiftMaster.is_active == True,
-        )
-        .all()
+    return result
+
+
+def _aggregate_project_ids(lead, db: Session) -> list[int]:
+    return (
+        get_lead_project_ids(lead, db, active_only=True)
+        if lead.is_admin
+        else get_lead_project_ids(lead, db)
     )
 
-    # Build shift map with max allowance
-    shift_map = {}
-    for s in shifts:
-        existing = shift_map.get(s.shift_code)
-        if not existing:
-            shift_map[s.shift_code] = s
-        else:
-            if s.weekday_allowance > existing.weekday_allowance:
-                existing.weekday_allowance = s.weekday_allowance
-            if s.weekend_allowance > existing.weekend_allowance:
-                existing.weekend_allowance = s.weekend_allowance
 
-    # 🔹 Fetch allocations
-    query = (
-        db.query(
-            ShiftAllocation.emp_id,
-            Employee.emp_name,            
-            Employee.emp_lname,
-            ShiftAllocation.shift_code,
-            ShiftAllocation.shift_date,
-            ShiftAllocation.project_id,
+def _aggregate_report(
+    db: Session,
+    project_ids,
+    from_date: date,
+    to_date: date,
+    mode: str = "python",
+):
+    """Shift headers and per-employee rows across projects."""
+    # 🔹 Fetch all active shift versions for these projects
+    shift_index = ShiftMasterIndex.load(db, project_ids, from_date, to_date)
+
+    # 🔹 Header shows the highest allowance per shift_code
+    shift_headers = {}
+
+    for s in shift_index.versions():
+        header = shift_headers.setdefault(s.shift_code, {
+            "shift_code": s.shift_code,
+            "shift_name": s.shift_name,
+            "start_time": str(s.start_time),
+            "end_time": str(s.end_time),
+            "weekday_allowance": float(s.weekday_allowance),
+            "weekend_allowance": float(s.weekend_allowance),
+        })
+        header["weekday_allowance"] = max(
+            header["weekday_allowance"], float(s.weekday_allowance)
         )
-        .join(Employee)
-        .filter(
-            ShiftAllocation.project_id.in_(project_ids),
-            ShiftAllocation.shift_date.between(from_date, to_date),
-            ShiftAllocation.is_approved == True,
+        header["weekend_allowance"] = max(
+            header["weekend_allowance"], float(s.weekend_allowance)
+        )
+
+    if mode == "sql":
+        rows = _sql_allowance_rows(
+            db, project_ids, from_date, to_date,
+            ProjectHoliday.project_id.is_(None),
         )
+    else:
+        # 🔹 Fetch holidays across projects
+        holidays = get_holidays_map(db, None, from_date, to_date)
+        day_types = classify_dates(from_date, to_date, holidays)
+
+        # 🔹 Scan approved allocations across projects
+        allocations = scan(
+            _approved_allocations(db, project_ids, from_date, to_date)
+        )
+
+        rows = tally_allowances(
+            allocations,
+            day_types,
+            shift_index.resolve,
+            dedup=True,
+        )
+
+    return list(shift_headers.values()), rows
+
+
+@router.get("/reports/employee-allowance/aggregate")
+def employee_allowance_report_aggregate(
+    request: Request,
+    response: Response,
+    from_date: date,
+    to_date: date,
+    mode: Literal["python", "sql"] = "python",
+    db: Session = Depends(get_db),
+    lead=Depends(get_current_lead),
+):
+    project_ids = _aggregate_project_ids(lead, db)
+
+    if not project_ids:
+        return {"shifts": [], "rows": []}
+
+    # Project ids are part of the ETag: access changes alter the payload
+    version = get_data_version(db, project_ids, from_date, to_date)
+    etag = request_etag(request, sorted(project_ids), version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    cache_key = (
+        "aggregate", tuple(sorted(project_ids)), from_date, to_date, mode, version
     )
+    result = _report_cache.get(cache_key)
 
-    if emp_id:
-        query = query.filter(ShiftAllocation.emp_id == emp_id)
+    if result is None:
+        shifts, rows = _aggregate_report(
+            db, project_ids, from_date, to_date, mode
+        )
+        result = {
+            "shifts": shifts,
+            "rows": rows,
+        }
+        _cache_report(cache_key, result)
 
-    allocations = query.all()
+    return result
+
+
+@router.get("/reports/employee-allowance/aggregate/export")
+def export_allowance_report_aggregate(
+    from_date: date,
+    to_date: date,
+    format: Literal["csv", "xlsx"] = "csv",
+    mode: Literal["python", "sql"] = "python",
+    db: Session = Depends(get_db),
+    lead=Depends(get_current_lead),
+):
+    project_ids = _aggregate_project_ids(lead, db)
+    # The export streams on a session of its own; release this one now
+    db.close()
+
+    def rows():
+        # The response outlives the request session, so use our own
+        db = SessionLocal()
+        try:
+            shifts, report = (
+                _aggregate_report(db, project_ids, from_date, to_date, mode)
+                if project_ids else ([], [])
+            )
+            shift_codes = [s["shift_code"] for s in shifts]
+
+            yield (
+                "emp_id", "emp_name", "emp_lname", *shift_codes,
+                "weekend_shift_count", "holiday_shift_count", "total_allowance",
+            )
+
+            for r in report:
+                yield (
+                    r["emp_id"], r["emp_name"], r["emp_lname"],
+                    *(r["shift_counts"].get(code, 0) for code in shift_codes),
+                    r["weekend_shift_count"],
+                    r["holiday_shift_count"],
+                    r["total_allowance"],
+                )
+        finally:
+            db.close()
+
+    return export_response(
+        format, f"allowance-summary-{from_date}-{to_date}", rows()
+    )
+
+
+def _detailed_project_ids(
+    lead, project_id: int | None, db: Session
+) -> list[int]:
+    # 🔹 Get accessible projects
+    project_ids = get_lead_project_ids(lead, db)
+
+    if project_id:
+        return [project_id] if project_id in project_ids else []
+
+    return project_ids
+
+
+def _iter_detailed(
+    db: Session,
+    project_ids,
+    from_date: date,
+    to_date: date,
+    emp_id: int | None = None,
+    progress=None,
+):
+    """
+    Yield (row, project_name, day_type, rate) per priced allocation, in
+    date order. Lookups run up front; allocations are then scanned in
+    batches. progress(done, total) is called as allocation rows are read.
+    """
+    # 🔹 Fetch shift versions
+    shift_index = ShiftMasterIndex.load(db, project_ids, from_date, to_date)
+
+    project_names = dict(
+        db.query(Project.project_id, Project.name)
+        .filter(Project.project_id.in_(project_ids))
+        .all()
+    )
 
     holidays = {
         h.holiday_date.isoformat(): h
@@ -338,61 +535,78 @@ def employee_allowance_detailed(
         )
         .all()
     }
+    day_types = classify_dates(from_date, to_date, holidays)
 
-    seen = set()
-    summary = {
-        "weekday_count": 0,
-        "weekend_count": 0,
-        "holiday_count": 0,
-        "total_allowance": 0,
-    }
+    # 🔹 Fetch allocations; date order lets daily rows be emitted as
+    # they stream from the cursor.
+    allocations = _approved_allocations(db, project_ids, from_date, to_date)
 
-    daily = []
+    if emp_id:
+        allocations = allocations.filter(ShiftAllocation.emp_id == emp_id)
 
-    for emp_id_val, emp_name, emp_lname, shift_code, shift_date, proj_id in allocations:
+    rows = scan(allocations)
+    if progress is not None:
+        rows = _with_progress(rows, allocations.order_by(None).count(), progress)
 
-        unique_key = (emp_id_val, shift_date, shift_code)
-        if unique_key in seen:
-            continue
-        seen.add(unique_key)
+    for row, day_type, shift in iter_classified(
+        rows,
+        day_types,
+        shift_index.resolve,
+        dedup=True,
+    ):
+        yield row, project_names.get(row[5]), day_type, shift_rate(shift, day_type)
 
-        shift = shift_map.get(shift_code)
-        if not shift:
-            continue
 
-        is_weekend = shift_date.weekday() >= 5
-        is_holiday = shift_date.isoformat() in holidays
+def _with_progress(rows, total: int, progress, every: int = 1000):
+    progress(0, total)
+    done = 0
 
-        if is_weekend or is_holiday:
-            allowance = float(shift.weekend_allowance)
-            if is_weekend:
-                summary["weekend_count"] += 1
-                shift_type = "Weekend"
-            else:
-                summary["holiday_count"] += 1
-                shift_type = "Holiday"
-        else:
-            allowance = float(shift.weekday_allowance)
-            summary["weekday_count"] += 1
-            shift_type = "Weekday"
+    for row in rows:
+        yield row
+        done += 1
+        if done % every == 0:
+            progress(done, total)
 
-        summary["total_allowance"] += allowance
+    progress(done, total)
 
-        project_name = (
-            db.query(Project.name)
-            .filter(Project.project_id == proj_id)
-            .scalar()
-        )
+
+def _detailed_report(
+    db: Session,
+    project_ids,
+    from_date: date,
+    to_date: date,
+    emp_id: int | None = None,
+    progress=None,
+):
+    summary_counts = Counter()
+    summary_total = Decimal(0)
+    daily = []
+    emp_name = emp_lname = None
+
+    for row, project_name, day_type, rate in _iter_detailed(
+        db, project_ids, from_date, to_date, emp_id, progress
+    ):
+        _, emp_name, emp_lname, shift_code, shift_date, _ = row
+
+        summary_counts[day_type] += 1
+        summary_total += rate
 
         daily.append({
             "date": shift_date,
             "project": project_name,
             "shift_code": shift_code,
-            "type": shift_type,
-            "allowance": allowance,
+            "type": day_type,
+            "allowance": float(rate),
             "employee": emp_name
         })
 
+    summary = {
+        "weekday_count": summary_counts[WEEKDAY],
+        "weekend_count": summary_counts[WEEKEND],
+        "holiday_count": summary_counts[HOLIDAY],
+        "total_allowance": float(summary_total),
+    }
+
     return {
         "employee": {
             "emp_id": emp_id,
@@ -400,10 +614,159 @@ def employee_allowance_detailed(
             "emp_lname": emp_lname,
         } if emp_id else None,
         "summary": summary,
-        "daily": sorted(daily, key=lambda x: x["date"]),
+        "daily": daily,
     }
 
 
+@router.get("/reports/employee-allowance/detailed")
+def employee_allowance_detailed(
+    request: Request,
+    response: Response,
+    from_date: date,
+    to_date: date,
+    project_id: int | None = None,
+    emp_id: int | None = None,
+    db: Session = Depends(get_db),
+    lead=Depends(get_current_lead),
+):
+    project_ids = _detailed_project_ids(lead, project_id, db)
+
+    if not project_ids:
+        return {"summary": {}, "daily": []}
+
+    etag = request_etag(
+        request,
+        sorted(project_ids),
+        get_data_version(db, project_ids, from_date, to_date),
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    return _detailed_report(db, project_ids, from_date, to_date, emp_id)
+
+
+@router.get("/reports/employee-allowance/detailed/export")
+def export_allowance_detailed(
+    from_date: date,
+    to_date: date,
+    format: Literal["csv", "xlsx"] = "csv",
+    project_id: int | None = None,
+    emp_id: int | None = None,
+    db: Session = Depends(get_db),
+    lead=Depends(get_current_lead),
+):
+    project_ids = _detailed_project_ids(lead, project_id, db)
+    # The export streams on a session of its own; release this one now
+    db.close()
+
+    def rows():
+        yield (
+            "date", "emp_id", "emp_name", "emp_lname",
+            "project", "shift_code", "type", "allowance",
+        )
+
+        if not project_ids:
+            return
+
+        # The response outlives the request session, so use our own
+        db = SessionLocal()
+        try:
+            for row, project_name, day_type, rate in _iter_detailed(
+                db, project_ids, from_date, to_date, emp_id
+            ):
+                row_emp_id, emp_name, emp_lname, shift_code, shift_date, _ = row
+                yield (
+                    shift_date.isoformat(), row_emp_id, emp_name, emp_lname,
+                    project_name, shift_code, day_type, float(rate),
+                )
+        finally:
+            db.close()
+
+    return export_response(
+        format, f"allowance-daily-{from_date}-{to_date}", rows()
+    )
+
+
+def _run_detailed_job(job, project_ids, from_date, to_date, emp_id):
+    # Same answer as the sync endpoint for a lead with no projects
+    if not project_ids:
+        return {"summary": {}, "daily": []}
+
+    # Runs on the job pool, outside any request, so it owns its session
+    db = SessionLocal()
+    try:
+        return _detailed_report(
+            db, project_ids, from_date, to_date, emp_id,
+            progress=job.report_progress,
+        )
+    finally:
+        db.close()
+
+
+@router.post("/reports/jobs", status_code=202)
+def submit_report_job(
+    data: ReportJobRequest,
+    db: Session = Depends(get_db),
+    lead=Depends(get_current_lead),
+):
+    project_ids = _detailed_project_ids(lead, data.project_id, db)
+
+    try:
+        job = report_jobs.submit(
+            lead.lead_id,
+            data.report,
+            data.model_dump(mode="json"),
+            _run_detailed_job,
+            project_ids, data.from_date, data.to_date, data.emp_id,
+        )
+    except JobQueueFull:
+        raise HTTPException(503, "Too many report jobs, try again shortly")
+
+    return job
+
+
+@router.get("/reports/jobs")
+def list_report_jobs(
+    lead=Depends(get_current_lead),
+):
+    return report_jobs.list(lead.lead_id)
+
+
+@router.get("/reports/jobs/{job_id}")
+def get_report_job(
+    job_id: str,
+    lead=Depends(get_current_lead),
+):
+    job = report_jobs.get(job_id, lead.lead_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+
+    return job
+
+
+@router.get("/reports/jobs/{job_id}/result")
+def get_report_job_result(
+    job_id: str,
+    lead=Depends(get_current_lead),
+):
+    job = report_jobs.get(job_id, lead.lead_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+
+    # The request succeeded; the job did not. Clients read status/error.
+    if job["status"] == FAILED:
+        return job
+
+    if job["status"] != DONE:
+        raise HTTPException(409, "Job not finished")
+
+    # Stored as the serialised report, so no need to decode and re-encode
+    return StreamingResponse(
+        report_jobs.iter_result(job_id), media_type="application/json"
+    )
+
+
 @router.get("/reports/employees")
 def get_employees_for_report(
     project_id: int | None = None,
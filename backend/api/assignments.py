@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import and_, insert
 from sqlalchemy.orm import Session
 
 from models.database import get_db
@@ -7,6 +8,7 @@ from models.models import (
     ProjectEmployee,
     Employee,
 )
+from models.schemas import AssignmentBatchRequest
 from api.dependencies import get_current_lead, get_project_or_403
 
 router = APIRouter(
@@ -72,6 +74,67 @@ def get_available_employees(
     ]
 
 
+# Declared before the single-employee routes so "batch" is not read as an emp_id
+@router.post("/projects/{project_id}/employees/batch")
+def batch_assign_employees(
+    project_id: int,
+    data: AssignmentBatchRequest,
+    db: Session = Depends(get_db),
+    lead = Depends(get_current_lead),
+):
+    get_project_or_403(project_id, lead, db)
+
+    assign_ids = set(data.assign)
+    unassign_ids = set(data.unassign)
+
+    if assign_ids & unassign_ids:
+        raise HTTPException(
+            400, "Employee cannot be both assigned and unassigned"
+        )
+
+    # Employee existence and current membership in a single round-trip
+    rows = (
+        db.query(Employee.emp_id, ProjectEmployee.emp_id)
+        .outerjoin(
+            ProjectEmployee,
+            and_(
+                ProjectEmployee.emp_id == Employee.emp_id,
+                ProjectEmployee.project_id == project_id,
+            ),
+        )
+        .filter(Employee.emp_id.in_(assign_ids | unassign_ids))
+        .all()
+    )
+
+    known = {emp_id for emp_id, _ in rows}
+    members = {emp_id for emp_id, member in rows if member is not None}
+
+    to_assign = sorted(assign_ids & known - members)
+    to_unassign = sorted(unassign_ids & members)
+
+    if to_assign:
+        db.execute(
+            insert(ProjectEmployee),
+            [{"project_id": project_id, "emp_id": emp_id} for emp_id in to_assign],
+        )
+
+    if to_unassign:
+        db.query(ProjectEmployee).filter(
+            ProjectEmployee.project_id == project_id,
+            ProjectEmployee.emp_id.in_(to_unassign),
+        ).delete(synchronize_session=False)
+
+    db.commit()
+
+    return {
+        "assigned": to_assign,
+        "already_assigned": sorted(assign_ids & members),
+        "unassigned": to_unassign,
+        "not_assigned": sorted(unassign_ids & known - members),
+        "not_found": sorted((assign_ids | unassign_ids) - known),
+    }
+
+
 @router.post("/projects/{project_id}/employees/{emp_id}")
 def assign_employee(
     project_id: int,
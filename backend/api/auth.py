@@ -1,20 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from datetime import datetime, timedelta
 import pytz 
 import jwt
 import random
-from passlib.context import CryptContext
 
-from models.database import get_db
+from models.database import get_db, get_async_db
 from models.models import ProjectLead , Employee
 from models.schemas import (
     LoginRequest,
     EmailRequest,
     ResetPasswordRequest,
 )
-from utils.email_utils import send_email
+from utils.mail_queue import enqueue_email
+from utils import passwords
 
 router = APIRouter(
     prefix="/auth", 
@@ -26,24 +27,38 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1024
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ist = pytz.timezone('Asia/Kolkata') 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
+    try:
+        return passwords.hash_password(password)
+    except passwords.PasswordQueueFull:
+        raise HTTPException(503, "Server busy, try again shortly")
+
+async def verify_password_async(password: str, passhash: str) -> bool:
+    try:
+        return await passwords.verify_password_async(password, passhash)
+    except passwords.PasswordQueueFull:
+        raise HTTPException(503, "Server busy, try again shortly")
+
+# Logins are async so a storm waits on the hashing workers without
+# holding request threads; the lookup goes through the async session,
+# released before the slow verify.
 @router.post("/login")
-def login(data: LoginRequest, db: Session = Depends(get_db)):
+async def login(data: LoginRequest, db=Depends(get_async_db)):
     lead = (
-        db.query(ProjectLead)
-        .filter(
-            ProjectLead.email == data.email,
-            ProjectLead.is_active == True
+        await db.execute(
+            select(ProjectLead)
+            .where(
+                ProjectLead.email == data.email,
+                ProjectLead.is_active == True
+            )
+            .limit(1)
         )
-        .first()
-    )
+    ).scalars().first()
+    await db.close()
 
-    if not lead or not pwd_context.verify(data.password, lead.passhash):
+    if not lead or not await verify_password_async(data.password, lead.passhash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = jwt.encode(
@@ -52,6 +67,7 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
             "lead_id": lead.lead_id,
             "email": lead.email,
             "is_admin": lead.is_admin,
+            "iat": datetime.now(ist),
             "exp": datetime.now(ist) + timedelta(
                 minutes=ACCESS_TOKEN_EXPIRE_MINUTES
             ),
@@ -66,23 +82,26 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @router.post("/employee/login")
-def employee_login(
+async def employee_login(
     data: LoginRequest,
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
 ):
     employee = (
-        db.query(Employee)
-        .filter(
-            Employee.email == data.email,
-            Employee.is_active == True
+        await db.execute(
+            select(Employee)
+            .where(
+                Employee.email == data.email,
+                Employee.is_active == True
+            )
+            .limit(1)
         )
-        .first()
-    )
+    ).scalars().first()
+    await db.close()
 
     if not employee or not employee.passhash:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not pwd_context.verify(data.password, employee.passhash):
+    if not await verify_password_async(data.password, employee.passhash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = jwt.encode(
@@ -91,6 +110,7 @@ def employee_login(
             "name": employee.emp_name,
             "emp_id": employee.emp_id,
             "email": employee.email,
+            "iat": datetime.now(ist),
             "exp": datetime.now(ist) + timedelta(
                 minutes=ACCESS_TOKEN_EXPIRE_MINUTES
             ),
@@ -123,12 +143,12 @@ def send_otp(data: EmailRequest, db: Session = Depends(get_db)):
     user.otp_expiry = expiry
     db.commit()
 
-    if not send_email(
+    if not enqueue_email(
         recipient=user.email,
         subject="ShiftRoster - Password Reset OTP",
         body=f"Your OTP is {otp}. It expires in 10 minutes.",
     ):
-        raise HTTPException(500, "Failed to send OTP")
+        raise HTTPException(503, "Mail queue is full, try again shortly")
 
     return {"message": "OTP sent successfully"}
 
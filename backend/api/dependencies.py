@@ -1,20 +1,28 @@
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy import or_, event, func, inspect, select, update
 
+import os
+import time
+import threading
 import jwt
+from bisect import bisect_right
 from datetime import date
 
-from models.database import get_db
+from models.database import get_db, get_async_db, SessionLocal
 from models.models import (
+    AccessVersion,
     ProjectLead,
     ProjectLeadAssignment,
     Project,
     ProjectShiftMaster,
     Employee,
     ProjectHoliday,
+    ShiftAllocation,
 )
+from utils.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -22,10 +30,85 @@ SECRET_KEY = "UTIS.SHIFT.ROSTER"
 ALGORITHM = "HS256"
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-):
+#PRINCIPAL CACHE
+
+# Keyed by (user_type, id, iat) so a fresh login never sees an older snapshot.
+# FastAPI already de-duplicates get_current_user within one request; this
+# cache removes the principal SELECT across requests.
+#
+# Invalidation is per process: a deactivation or admin change made on
+# another worker takes effect here within PRINCIPAL_CACHE_TTL seconds,
+# which is why the default is kept short.
+_principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "15")),
+)
+
+# Bumped by every invalidation. A load that straddles one is not cached,
+# as it may have read the row before the change committed.
+_principal_epoch = 0
+_principal_epoch_lock = threading.Lock()
+
+
+def invalidate_principal(user_type: str, user_id: int):
+    global _principal_epoch
+
+    with _principal_epoch_lock:
+        _principal_epoch += 1
+
+    _principal_cache.pop_where(
+        lambda key: key[0] == user_type and key[1] == user_id
+    )
+
+
+def _defer_invalidation(target, user_type: str, user_id: int):
+    # Rows not yet in the database cannot have been cached
+    if inspect(target).key is None:
+        return
+
+    # Until commit other requests still read the old row, so drop the
+    # cached copy only once the change is visible.
+    session = object_session(target)
+    if session is None:
+        invalidate_principal(user_type, user_id)
+        return
+
+    session.info.setdefault("invalidate_principals", set()).add(
+        (user_type, user_id)
+    )
+
+
+@event.listens_for(ProjectLead.is_active, "set")
+@event.listens_for(ProjectLead.is_admin, "set")
+def _on_lead_access_change(target, value, oldvalue, initiator):
+    _defer_invalidation(target, "lead", target.lead_id)
+
+
+@event.listens_for(Employee.is_active, "set")
+def _on_employee_access_change(target, value, oldvalue, initiator):
+    _defer_invalidation(target, "employee", target.emp_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_principals(session):
+    for user_type, user_id in session.info.pop("invalidate_principals", ()):
+        invalidate_principal(user_type, user_id)
+
+
+def _principal_stmt(user_type: str, user_id):
+    if user_type == "lead":
+        return select(ProjectLead).where(
+            ProjectLead.lead_id == user_id,
+            ProjectLead.is_active == True,
+        ).limit(1)
+
+    return select(Employee).where(
+        Employee.emp_id == user_id,
+        Employee.is_active == True,
+    ).limit(1)
+
+
+def _principal_cache_key(token: str) -> tuple:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
@@ -36,30 +119,65 @@ def get_current_user(
     user_type = payload.get("user_type")
 
     if user_type == "lead":
-        user = (
-            db.query(ProjectLead)
-            .filter(
-                ProjectLead.lead_id == payload.get("lead_id"),
-                ProjectLead.is_active == True,
-            )
-            .first()
-        )
+        user_id = payload.get("lead_id")
     elif user_type == "employee":
-        user = (
-            db.query(Employee)
-            .filter(
-                Employee.emp_id == payload.get("emp_id"),
-                Employee.is_active == True,
-            )
-            .first()
-        )
+        user_id = payload.get("emp_id")
     else:
         raise HTTPException(401, "Invalid user type")
 
-    if not user:
-        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Unauthorized")
+    return (user_type, user_id, payload.get("iat"))
 
-    return user
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
+    cache_key = _principal_cache_key(token)
+    cached = _principal_cache.get(cache_key)
+
+    if cached is None:
+        epoch = _principal_epoch
+        cached = db.scalars(_principal_stmt(*cache_key[:2])).first()
+
+        if not cached:
+            raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Unauthorized")
+
+        # Keep the cached snapshot detached so commits in this session
+        # never expire it.
+        db.expunge(cached)
+        if epoch == _principal_epoch:
+            _principal_cache.set(cache_key, cached)
+
+    # Attach a copy to this session without a round-trip.
+    return db.merge(cached, load=False)
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db=Depends(get_async_db),
+):
+    """
+    get_current_user for async handlers, so a request holds only its
+    async session. Returns the detached cached snapshot itself, which
+    callers must treat as read-only.
+    """
+    cache_key = _principal_cache_key(token)
+    cached = _principal_cache.get(cache_key)
+
+    if cached is None:
+        epoch = _principal_epoch
+        cached = (
+            await db.execute(_principal_stmt(*cache_key[:2]))
+        ).scalars().first()
+
+        if not cached:
+            raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Unauthorized")
+
+        db.expunge(cached)
+        if epoch == _principal_epoch:
+            _principal_cache.set(cache_key, cached)
+
+    return cached
 
 
 def get_current_lead(
@@ -78,39 +196,154 @@ def get_current_employee(
 
     return user
 
-def get_project_or_403(
-    project_id: int,
-    lead: ProjectLead,
-    db: Session,
-) -> Project:
+#PROJECT ACCESS INDEX
 
-    project = (
-        db.query(Project)
-        .filter(
-            Project.project_id == project_id,
-            Project.is_active == True,
+# lead_id -> assigned project_ids, plus detached snapshots of active projects.
+# Every write to project or project_lead_assignment bumps the one-row
+# access_version counter in the same transaction, and every read compares
+# that counter (a primary-key read on the caller's session) against the
+# version the index was built from, so writes made through any worker
+# are seen on the next request. The TTL is only a backstop for writes
+# that bypass the ORM.
+ACCESS_INDEX_TTL = float(os.getenv("ACCESS_INDEX_TTL", "300"))
+
+_access_index = None
+_access_index_lock = threading.Lock()
+
+_ACCESS_MODELS = (Project, ProjectLeadAssignment)
+
+
+def access_version_stmt():
+    return select(AccessVersion.version).where(AccessVersion.id == 1)
+
+
+def bump_access_version(db: Session):
+    db.execute(
+        update(AccessVersion)
+        .where(AccessVersion.id == 1)
+        .values(version=AccessVersion.version + 1)
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_access_flush(session, flush_context, instances):
+    changed = (
+        any(isinstance(obj, _ACCESS_MODELS) for obj in session.new)
+        or any(isinstance(obj, _ACCESS_MODELS) for obj in session.deleted)
+        or any(
+            isinstance(obj, _ACCESS_MODELS) and session.is_modified(obj)
+            for obj in session.dirty
         )
-        .first()
     )
+    if changed:
+        bump_access_version(session)
 
-    if not project:
-        raise HTTPException(404, "Project not found")
 
-    # Admin bypass
-    if lead.is_admin:
-        return project
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_access_bulk_write(state):
+    # Bulk insert/update/delete statements never reach before_flush
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
 
-    # Check many-to-many assignment
-    mapping = (
-        db.query(ProjectLeadAssignment)
-        .filter(
-            ProjectLeadAssignment.project_id == project_id,
-            ProjectLeadAssignment.lead_id == lead.lead_id,
-        )
-        .first()
+    mapper = state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, _ACCESS_MODELS):
+        bump_access_version(state.session)
+
+
+def _build_access_index():
+    db = SessionLocal()
+    try:
+        # Read before the data: a write in between makes the next
+        # version differ and triggers another rebuild.
+        version = db.scalar(access_version_stmt())
+        projects = db.query(Project).all()
+        assignments = db.query(
+            ProjectLeadAssignment.lead_id,
+            ProjectLeadAssignment.project_id,
+        ).all()
+        db.expunge_all()
+    finally:
+        db.close()
+
+    lead_projects = {}
+    for lead_id, project_id in assignments:
+        lead_projects.setdefault(lead_id, set()).add(project_id)
+
+    return {
+        "built_at": time.monotonic(),
+        "version": version,
+        "all_project_ids": {p.project_id for p in projects},
+        "active_projects": {p.project_id: p for p in projects if p.is_active},
+        "lead_projects": lead_projects,
+    }
+
+
+def _is_current(index, version) -> bool:
+    return (
+        index is not None
+        and index["version"] == version
+        and time.monotonic() - index["built_at"] < ACCESS_INDEX_TTL
     )
 
-    if not mapping:
+
+def _access_index_for(version):
+    global _access_index
+
+    index = _access_index
+    if _is_current(index, version):
+        return index
+
+    # Rebuilds read every project, so they use a session of their own
+    # rather than filling the caller's identity map.
+    with _access_index_lock:
+        index = _access_index
+        if not _is_current(index, version):
+            index = _access_index = _build_access_index()
+
+    return index
+
+
+def get_access_index(db: Session):
+    """The access index, rebuilt first if projects or assignments changed."""
+    return _access_index_for(db.scalar(access_version_stmt()))
+
+
+def invalidate_access_index():
+    global _access_index
+    _access_index = None
+
+
+def get_lead_project_ids(
+    lead: ProjectLead,
+    db: Session,
+    active_only: bool = False,
+) -> list[int]:
+    """
+    Projects visible to a lead: every (active) project for admins,
+    otherwise the lead's assignments.
+    """
+    index = get_access_index(db)
+
+    if lead.is_admin:
+        if active_only:
+            return list(index["active_projects"])
+        return list(index["all_project_ids"])
+
+    project_ids = index["lead_projects"].get(lead.lead_id, set())
+
+    if active_only:
+        return [pid for pid in project_ids if pid in index["active_projects"]]
+    return list(project_ids)
+
+
+def _check_access(index, project_id: int, lead: ProjectLead) -> Project:
+    project = index["active_projects"].get(project_id)
+
+    if not project:
+        raise HTTPException(404, "Project not found")
+
+    # Admin bypass, otherwise check many-to-many assignment
+    if not lead.is_admin and project_id not in index["lead_projects"].get(lead.lead_id, ()):
         raise HTTPException(
             status.HTTP_403_FORBIDDEN,
             "Not authorized for this project",
@@ -119,34 +352,138 @@ def get_project_or_403(
     return project
 
 
-#SHIFT CORE 
-
-def get_shift_for_date(
+def check_project_access(
+    project_id: int,
+    lead: ProjectLead,
     db: Session,
+) -> Project:
+    """Access check against the index. Returns a detached Project snapshot."""
+    return _check_access(get_access_index(db), project_id, lead)
+
+
+async def check_project_access_async(
     project_id: int,
-    shift_code: str,
-    shift_date: date,
-) -> ProjectShiftMaster:
+    lead: ProjectLead,
+    db,
+) -> Project:
+    """
+    check_project_access for async handlers. The probe runs on their
+    async session; only a rebuild goes to the threadpool.
+    """
+    version = await db.scalar(access_version_stmt())
+
+    index = _access_index
+    if not _is_current(index, version):
+        index = await run_in_threadpool(_access_index_for, version)
+
+    return _check_access(index, project_id, lead)
+
+
+def get_project_or_403(
+    project_id: int,
+    lead: ProjectLead,
+    db: Session,
+) -> Project:
+
+    project = check_project_access(project_id, lead, db)
+
+    return db.merge(project, load=False)
+
+
+def _locking_read(query):
+    """
+    Shared-lock read of the latest committed rows rather than the
+    transaction's snapshot, refreshing objects already in the session.
+    """
+    return query.with_for_update(read=True).populate_existing()
+
+
+#SHIFT CORE
+
+class ShiftMasterIndex:
     """
     Canonical shift resolver.
     DO NOT duplicate this logic anywhere else.
+
+    Active ProjectShiftMaster versions grouped per (project_id, shift_code)
+    and sorted by effective_from, so each (code, date) lookup is a bisect.
     """
 
-    shift = (
-        db.query(ProjectShiftMaster)
-        .filter(
-            ProjectShiftMaster.project_id == project_id,
-            ProjectShiftMaster.shift_code == shift_code,
-            ProjectShiftMaster.effective_from <= shift_date,
+    def __init__(self, shifts):
+        self._versions = {}
+
+        for s in sorted(shifts, key=lambda s: s.effective_from):
+            self._versions.setdefault((s.project_id, s.shift_code), []).append(s)
+
+        self._starts = {
+            key: [s.effective_from for s in versions]
+            for key, versions in self._versions.items()
+        }
+
+    @classmethod
+    def load(
+        cls,
+        db: Session,
+        project_ids,
+        from_date: date,
+        to_date: date,
+        shift_code: str | None = None,
+        for_share: bool = False,
+    ) -> "ShiftMasterIndex":
+        query = db.query(ProjectShiftMaster).filter(
+            ProjectShiftMaster.project_id.in_(project_ids),
+            ProjectShiftMaster.effective_from <= to_date,
             or_(
                 ProjectShiftMaster.effective_to.is_(None),
-                ProjectShiftMaster.effective_to >= shift_date,
+                ProjectShiftMaster.effective_to >= from_date,
             ),
             ProjectShiftMaster.is_active == True,
         )
-        .order_by(ProjectShiftMaster.effective_from.desc())
-        .one_or_none()
-    )
+
+        if shift_code is not None:
+            query = query.filter(ProjectShiftMaster.shift_code == shift_code)
+
+        if for_share:
+            query = _locking_read(query)
+
+        return cls(query.all())
+
+    def resolve(
+        self,
+        project_id: int,
+        shift_code: str,
+        shift_date: date,
+    ) -> ProjectShiftMaster | None:
+        key = (project_id, shift_code)
+        versions = self._versions.get(key)
+        if not versions:
+            return None
+
+        i = bisect_right(self._starts[key], shift_date) - 1
+        if i < 0:
+            return None
+
+        shift = versions[i]
+        if shift.effective_to is not None and shift.effective_to < shift_date:
+            return None
+
+        return shift
+
+    def versions(self):
+        for versions in self._versions.values():
+            yield from versions
+
+
+def get_shift_for_date(
+    db: Session,
+    project_id: int,
+    shift_code: str,
+    shift_date: date,
+) -> ProjectShiftMaster:
+
+    shift = ShiftMasterIndex.load(
+        db, [project_id], shift_date, shift_date, shift_code
+    ).resolve(project_id, shift_code, shift_date)
 
     if not shift:
         raise HTTPException(
@@ -166,8 +503,9 @@ def get_holidays_map(
     project_id: int,
     from_date: date,
     to_date: date,
+    for_share: bool = False,
 ):
-    holidays = (
+    query = (
         db.query(ProjectHoliday)
         .filter(
             ProjectHoliday.holiday_date.between(from_date, to_date),
@@ -176,9 +514,13 @@ def get_holidays_map(
                 ProjectHoliday.project_id == project_id
             )
         )
-        .all()
     )
 
+    if for_share:
+        query = _locking_read(query)
+
+    holidays = query.all()
+
     holiday_map = {}
 
     for h in holidays:
@@ -194,6 +536,58 @@ def get_holidays_map(
     return holiday_map
 
 
+def data_version_stmt(project_ids, from_date: date, to_date: date):
+    """
+    Single-row SELECT fingerprinting everything a roster or report over
+    this scope reads: row count, row_version sum and highest key of
+    allocations, shift versions, holidays and projects. Counts catch
+    deletes, the row_version sum catches every edit and the highest key
+    catches an insert that replaces a delete. Works with both sync and
+    async sessions.
+    """
+    def fingerprint(model, key, *criteria):
+        return (
+            select(func.count()).select_from(model).where(*criteria)
+            .scalar_subquery(),
+            select(func.coalesce(func.sum(model.row_version), 0)).where(*criteria)
+            .scalar_subquery(),
+            select(func.max(key)).where(*criteria).scalar_subquery(),
+        )
+
+    return select(
+        *fingerprint(
+            ShiftAllocation,
+            ShiftAllocation.allocation_id,
+            ShiftAllocation.project_id.in_(project_ids),
+            ShiftAllocation.shift_date.between(from_date, to_date),
+        ),
+        *fingerprint(
+            ProjectShiftMaster,
+            ProjectShiftMaster.id,
+            ProjectShiftMaster.project_id.in_(project_ids),
+        ),
+        *fingerprint(
+            ProjectHoliday,
+            ProjectHoliday.holiday_id,
+            ProjectHoliday.holiday_date.between(from_date, to_date),
+            or_(
+                ProjectHoliday.project_id.is_(None),
+                ProjectHoliday.project_id.in_(project_ids),
+            ),
+        ),
+        *fingerprint(
+            Project,
+            Project.project_id,
+            Project.project_id.in_(project_ids),
+        ),
+    )
+
+
+def get_data_version(db: Session, project_ids, from_date: date, to_date: date):
+    stmt = data_version_stmt(project_ids, from_date, to_date)
+    return tuple(db.execute(stmt).one())
+
+
 def get_shift_allowance(
     db: Session,
     project_id: int,
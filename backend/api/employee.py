@@ -1,9 +1,25 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session, joinedload
+import csv
+import io
+import ijson
+import os
+import tempfile
 from models.database import get_db
 from api.auth import hash_password
+from utils import passwords
 from models.models import ProjectLead as ProjectLeadModel, Employee, ProjectLead,ProjectEmployee
-from api.dependencies import get_current_lead, get_project_or_403
+from api.dependencies import (
+    get_current_lead,
+    get_project_or_403,
+    invalidate_principal,
+)
 from models.schemas import (
     EmployeeCreateRequest,
     EmployeeUpdateRequest,
@@ -15,6 +31,9 @@ router = APIRouter(
     tags=["Employees"]
 )
 
+IMPORT_CHUNK_SIZE = int(os.getenv("EMPLOYEE_IMPORT_CHUNK_SIZE", "500"))
+IMPORT_SPOOL_BYTES = 1024 * 1024
+
 from fastapi import HTTPException
 
 @router.post("/")
@@ -48,6 +67,224 @@ def create_employee(
     return emp
 
 
+@router.post("/bulk")
+async def bulk_import_employees(
+    request: Request,
+    db: Session = Depends(get_db),
+    lead = Depends(get_current_lead),
+):
+    """
+    Import employees from a JSON array or, with Content-Type text/csv, a
+    CSV with columns emp_id, emp_name, emp_lname, email, is_experienced,
+    reporting_to. Returns one result per input row.
+    """
+    # Spool the body so large uploads go to disk instead of memory
+    spool = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+
+    is_csv = "csv" in request.headers.get("content-type", "")
+
+    try:
+        return await run_in_threadpool(
+            _import_employees, spool, is_csv, db, lead.lead_id
+        )
+    finally:
+        spool.close()
+
+
+def _is_json_array(spool) -> bool:
+    head = b""
+    while not head:
+        block = spool.read(64)
+        if not block:
+            break
+        head = block.lstrip()
+    spool.seek(0)
+    return head.startswith(b"[")
+
+
+def _read_import_rows(spool, is_csv: bool):
+    if is_csv:
+        text = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        for row in csv.DictReader(text):
+            # Blank CSV cells fall back to the schema defaults
+            yield {k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()}
+        return
+
+    if not _is_json_array(spool):
+        raise HTTPException(400, "Body must be a JSON array or CSV")
+
+    # Parsed one element at a time, so memory stays at one chunk of rows
+    # however large the upload; a syntax error stops the import there
+    yield from ijson.items(spool, "item", use_float=True)
+
+
+def _echo_emp_id(raw):
+    # Invalid rows still report which employee they were, when it parses
+    if not isinstance(raw, dict):
+        return None
+    try:
+        return int(raw.get("emp_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _import_employees(spool, is_csv: bool, db: Session, lead_id: int):
+    results = []
+    seen_ids = set()
+    seen_emails = set()
+    chunk = []
+
+    def flush():
+        results.extend(
+            _import_chunk(db, chunk, lead_id, seen_ids, seen_emails)
+        )
+        chunk.clear()
+
+    row_no = 0
+    try:
+        for row_no, raw in enumerate(_read_import_rows(spool, is_csv), start=1):
+            chunk.append((row_no, raw))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                flush()
+    except (UnicodeDecodeError, csv.Error, ijson.JSONError) as e:
+        # Earlier chunks may already be committed: report, don't raise
+        results.append({
+            "row": row_no + 1,
+            "emp_id": None,
+            "status": "invalid",
+            "detail": f"Unreadable input, import stopped: {e}",
+        })
+
+    if chunk:
+        flush()
+
+    results.sort(key=lambda r: r["row"])
+    created = sum(1 for r in results if r["status"] == "created")
+
+    return {
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }
+
+
+def _import_chunk(db: Session, chunk, lead_id: int, seen_ids: set, seen_emails: set):
+    results = []
+    valid = []
+
+    for row_no, raw in chunk:
+        try:
+            valid.append((row_no, EmployeeCreateRequest(**raw)))
+        except (ValidationError, TypeError) as e:
+            if isinstance(e, ValidationError):
+                error = e.errors()[0]
+                detail = f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+            else:
+                detail = "Row must be an object"
+            results.append({
+                "row": row_no,
+                "emp_id": _echo_emp_id(raw),
+                "status": "invalid",
+                "detail": detail,
+            })
+
+    # One query per key for the whole chunk
+    existing_ids = {
+        emp_id for (emp_id,) in db.query(Employee.emp_id)
+        .filter(Employee.emp_id.in_({d.emp_id for _, d in valid}))
+    }
+    existing_emails = {
+        email.lower() for (email,) in db.query(Employee.email)
+        .filter(Employee.email.in_({d.email for _, d in valid}))
+    }
+    known_leads = {
+        lead_id for (lead_id,) in db.query(ProjectLead.lead_id)
+        .filter(ProjectLead.lead_id.in_(
+            {d.reporting_to for _, d in valid if d.reporting_to is not None}
+        ))
+    }
+
+    to_create = []
+    for row_no, data in valid:
+        email = data.email.lower()
+
+        if data.reporting_to is not None and data.reporting_to not in known_leads:
+            results.append({
+                "row": row_no,
+                "emp_id": data.emp_id,
+                "status": "invalid",
+                "detail": "reporting_to: no such lead",
+            })
+            continue
+
+        if data.emp_id in existing_ids or data.emp_id in seen_ids:
+            status = "duplicate_emp_id"
+        elif email in existing_emails or email in seen_emails:
+            status = "duplicate_email"
+        else:
+            seen_ids.add(data.emp_id)
+            seen_emails.add(email)
+            to_create.append((row_no, data))
+            continue
+
+        results.append({"row": row_no, "emp_id": data.emp_id, "status": status})
+
+    if not to_create:
+        return results
+
+    # Each chunk commits on its own, so a failure here must not escape:
+    # the caller still needs the report for the chunks already imported.
+    try:
+        hashes = passwords.hash_many([
+            f"{data.emp_id}{data.emp_name.lower()}" for _, data in to_create
+        ])
+
+        db.execute(
+            insert(Employee),
+            [
+                {
+                    "emp_id": data.emp_id,
+                    "emp_name": data.emp_name,
+                    "emp_lname": data.emp_lname,
+                    "email": data.email,
+                    "passhash": passhash,
+                    "is_experienced": data.is_experienced,
+                    "is_active": True,
+                    "reporting_to": data.reporting_to or lead_id,
+                }
+                for (_, data), passhash in zip(to_create, hashes)
+            ],
+        )
+        db.commit()
+    except (passwords.PasswordQueueFull, SQLAlchemyError) as e:
+        db.rollback()
+
+        if isinstance(e, passwords.PasswordQueueFull):
+            detail = "Server busy, retry these rows"
+        else:
+            detail = "Database rejected this chunk, retry these rows"
+
+        for row_no, data in to_create:
+            seen_ids.discard(data.emp_id)
+            seen_emails.discard(data.email.lower())
+            results.append({
+                "row": row_no,
+                "emp_id": data.emp_id,
+                "status": "failed",
+                "detail": detail,
+            })
+        return results
+
+    results.extend(
+        {"row": row_no, "emp_id": data.emp_id, "status": "created"}
+        for row_no, data in to_create
+    )
+    return results
+
+
 @router.put("/{emp_id}")
 def update_employee(
     emp_id: int,
@@ -65,32 +302,99 @@ def update_employee(
     emp.is_experienced = data.is_experienced
     emp.reporting_to = data.reporting_to
     db.commit()
+    invalidate_principal("employee", emp_id)
     return emp
 
 
+EMPLOYEE_FIELDS = {
+    "emp_id": Employee.emp_id,
+    "emp_name": Employee.emp_name,
+    "emp_lname": Employee.emp_lname,
+    "email": Employee.email,
+    "is_experienced": Employee.is_experienced,
+    "is_active": Employee.is_active,
+    "reporting_to": Employee.reporting_to,
+    "lead_name": ProjectLead.lead_name,
+}
+
+DEFAULT_EMPLOYEE_FIELDS = (
+    "emp_id", "emp_name", "emp_lname", "email", "is_experienced", "lead_name",
+)
+
+
 @router.get("/")
 def list_employees(
+    response: Response,
+    q: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    is_experienced: Optional[bool] = None,
+    reporting_to: Optional[int] = None,
+    fields: Optional[str] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     db: Session = Depends(get_db),
     lead = Depends(get_current_lead),
 ):
-    employees = db.query(Employee).all()
-    leads = {
-        l.lead_id: l.lead_name
-        for l in db.query(ProjectLead).all()
-    }
+    """
+    Employees ordered by emp_id. Pass `limit` to page: the next page starts
+    after the emp_id in the X-Next-Cursor header. `fields` is a comma
+    separated subset of EMPLOYEE_FIELDS.
+    """
+    names = (
+        [f.strip() for f in fields.split(",") if f.strip()]
+        if fields else list(DEFAULT_EMPLOYEE_FIELDS)
+    )
 
-    return [
-        {
-            "emp_id": e.emp_id,
-            "emp_name": e.emp_name,
-            "emp_lname": e.emp_lname,
-            "email": e.email,
-            "is_experienced": e.is_experienced,
-            "lead_name": leads.get(e.reporting_to),
-        }
-        for e in employees
-    ]
+    if not names:
+        raise HTTPException(400, "No fields requested")
+
+    unknown = [f for f in names if f not in EMPLOYEE_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}")
+
+    # emp_id is always selected so the cursor can be computed
+    columns = [Employee.emp_id] + [EMPLOYEE_FIELDS[f] for f in names]
+    query = db.query(*columns)
+
+    if "lead_name" in names:
+        query = query.outerjoin(
+            ProjectLead, ProjectLead.lead_id == Employee.reporting_to
+        )
+
+    if q:
+        # autoescape: % and _ in the search term match literally
+        term = q.lower()
+        query = query.filter(or_(
+            func.lower(Employee.emp_name).contains(term, autoescape=True),
+            func.lower(Employee.emp_lname).contains(term, autoescape=True),
+            func.lower(Employee.email).contains(term, autoescape=True),
+        ))
+
+    if is_active is not None:
+        query = query.filter(Employee.is_active == is_active)
+
+    if is_experienced is not None:
+        query = query.filter(Employee.is_experienced == is_experienced)
+
+    if reporting_to is not None:
+        query = query.filter(Employee.reporting_to == reporting_to)
+
+    if after is not None:
+        query = query.filter(Employee.emp_id > after)
+
+    query = query.order_by(Employee.emp_id)
+
+    if limit is not None:
+        # One extra row tells whether another page exists
+        rows = query.limit(limit + 1).all()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = str(rows[-1][0])
+    else:
+        rows = query.all()
 
+    return [dict(zip(names, row[1:])) for row in rows]
 
 
 @router.get("/leads", response_model=list[LeadOut])
@@ -142,4 +446,5 @@ def delete_employee(
 
     db.delete(emp)
     db.commit()
+    invalidate_principal("employee", emp_id)
     return {"message": "Employee deleted"}
@@ -7,6 +7,7 @@ from models.database import get_db
 from models.models import ProjectHoliday
 from models.schemas import HolidayCreate, HolidayResponse
 from api.dependencies import get_current_lead, get_project_or_403
+from api.ledger import lock_ledger, refresh_ledger, slices_for_dates
 
 
 router = APIRouter(prefix="/holidays", tags=["Holidays"])
@@ -58,6 +59,10 @@ def upsert_holiday(
         holiday.holiday_name = payload.holiday_name
         holiday.spl_allowance = payload.spl_allowance
     else:
+        # A company-wide holiday can reprice every project's month
+        slices = slices_for_dates(payload_project_id, [payload.holiday_date])
+        lock_ledger(db, slices)
+
         holiday = ProjectHoliday(
             project_id=payload_project_id,
             holiday_date=payload.holiday_date,
@@ -66,6 +71,9 @@ def upsert_holiday(
         )
         db.add(holiday)
 
+        # Only a new holiday reclassifies its date; a rename prices nothing
+        refresh_ledger(db, slices)
+
     db.commit()
     db.refresh(holiday)
     return holiday
@@ -85,6 +93,9 @@ def delete_holiday(
     if holiday.project_id:
         get_project_or_403(holiday.project_id, lead, db)
 
+    slices = slices_for_dates(holiday.project_id, [holiday.holiday_date])
+    lock_ledger(db, slices)
     db.delete(holiday)
+    refresh_ledger(db, slices)
     db.commit()
     return {"status": "deleted"}
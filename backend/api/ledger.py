@@ -0,0 +1,319 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.scan import scan
+from models.models import (
+    AllowanceLedger,
+    AllowanceLedgerLock,
+    Employee,
+    ShiftAllocation,
+)
+from api.dependencies import get_holidays_map, ShiftMasterIndex
+from utils.allowance_engine import allowance_groups, classify_dates
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_end(day: date) -> date:
+    return next_month(day) - timedelta(days=1)
+
+
+def closed_months(from_date: date, to_date: date, today: date | None = None):
+    """
+    (first, last) month starts of the full calendar months inside the
+    range that ended before the current month, or None. Only these are
+    served from the ledger; everything else is computed live.
+    """
+    first = month_start(from_date)
+    if first != from_date:
+        first = next_month(first)
+
+    last = month_start(to_date)
+    if month_end(last) != to_date:
+        last = month_start(last - timedelta(days=1))
+
+    current = month_start(today or date.today())
+    if last >= current:
+        last = month_start(current - timedelta(days=1))
+
+    if first > last:
+        return None
+
+    return first, last
+
+
+def _expand_slices(db: Session, slices, for_share: bool = False):
+    """
+    Normalise (project_id, month) pairs to month starts. project_id None
+    stands for a company-wide change and expands to every project with
+    approved allocations that month.
+    """
+    targets = set()
+    for project_id, month in slices:
+        month = month_start(month)
+
+        if project_id is not None:
+            targets.add((project_id, month))
+            continue
+
+        query = (
+            db.query(ShiftAllocation.project_id)
+            .filter(
+                ShiftAllocation.shift_date.between(month, month_end(month)),
+                ShiftAllocation.is_approved == True,
+            )
+            .distinct()
+        )
+        if for_share:
+            query = query.with_for_update(read=True)
+
+        targets.update((pid, month) for (pid,) in query)
+
+    return targets
+
+
+def lock_ledger(db: Session, slices, for_share: bool = False):
+    """
+    Take the ledger lock of each (project_id, month) slice, its
+    allowance_ledger_lock row FOR UPDATE, in key order; project_id None
+    as in _expand_slices. Writers whose changes feed the ledger call this
+    before writing, so two transactions never rebuild the same slice at
+    once while edits to other months of the project go ahead. for_share
+    makes the company-wide expansion a locking read. Returns the slices
+    locked, sorted.
+    """
+    targets = sorted(_expand_slices(db, slices, for_share))
+    if not targets:
+        return targets
+
+    # Plain read: a locking read of a missing key would gap-lock, and two
+    # transactions creating the same row would then deadlock
+    existing = set(
+        db.query(AllowanceLedgerLock.project_id, AllowanceLedgerLock.month)
+        .filter(
+            AllowanceLedgerLock.project_id.in_({p for p, _ in targets}),
+            AllowanceLedgerLock.month.in_({m for _, m in targets}),
+        )
+    )
+
+    for project_id, month in targets:
+        if (project_id, month) not in existing:
+            try:
+                # The insert itself holds the row lock until commit
+                with db.begin_nested():
+                    db.execute(
+                        insert(AllowanceLedgerLock)
+                        .values(project_id=project_id, month=month)
+                    )
+                continue
+            except IntegrityError:
+                # Created by a transaction that has since committed
+                pass
+
+        db.query(AllowanceLedgerLock.project_id).filter(
+            AllowanceLedgerLock.project_id == project_id,
+            AllowanceLedgerLock.month == month,
+        ).with_for_update().all()
+
+    return targets
+
+
+def rebuild_ledger_month(db: Session, project_id: int, month: date):
+    """
+    Recompute one (project, month) slice inside the caller's transaction,
+    which holds the slice's ledger lock. Inputs are read with locking
+    reads: under REPEATABLE READ the snapshot may predate a rebuild that
+    committed while we waited for the lock.
+    """
+    first, last = month, month_end(month)
+
+    db.query(AllowanceLedger).filter(
+        AllowanceLedger.project_id == project_id,
+        AllowanceLedger.month == month,
+    ).delete(synchronize_session=False)
+
+    allocations = (
+        db.query(
+            ShiftAllocation.emp_id,
+            ShiftAllocation.shift_code,
+            ShiftAllocation.shift_date,
+        )
+        .filter(
+            ShiftAllocation.project_id == project_id,
+            ShiftAllocation.shift_date.between(first, last),
+            ShiftAllocation.is_approved == True,
+        )
+        .order_by(ShiftAllocation.shift_date)
+        .with_for_update(read=True)
+    )
+
+    shift_index = ShiftMasterIndex.load(
+        db, [project_id], first, last, for_share=True
+    )
+    holidays = get_holidays_map(db, project_id, first, last, for_share=True)
+    day_types = classify_dates(first, last, holidays)
+
+    _, groups = allowance_groups(
+        (
+            (emp_id, None, None, shift_code, shift_date, project_id)
+            for emp_id, shift_code, shift_date in scan(allocations)
+        ),
+        day_types,
+        shift_index.resolve,
+    )
+
+    # Several shift versions in one month fold into one ledger row. Rates
+    # of versions added in this transaction may still be floats.
+    totals = {}
+    for emp_id, shift_code, day_type, count, total in groups:
+        key = (emp_id, shift_code, day_type)
+        prev_count, prev_total = totals.get(key, (0, Decimal(0)))
+        totals[key] = (prev_count + count, prev_total + Decimal(str(total)))
+
+    if totals:
+        db.execute(
+            insert(AllowanceLedger),
+            [
+                {
+                    "project_id": project_id,
+                    "month": month,
+                    "emp_id": emp_id,
+                    "shift_code": shift_code,
+                    "day_type": day_type,
+                    "shift_count": count,
+                    "total_allowance": total,
+                }
+                for (emp_id, shift_code, day_type), (count, total) in totals.items()
+            ],
+        )
+
+
+def refresh_ledger(db: Session, slices):
+    """
+    Rebuild every (project_id, month) slice given; project_id None as in
+    _expand_slices. Pending ORM changes are flushed first so the rebuild
+    sees them; the caller commits.
+    """
+    db.flush()
+
+    # Normally already held: writers lock before their first write. The
+    # locking read also catches projects that joined a company-wide
+    # month since then.
+    for project_id, month in lock_ledger(db, slices, for_share=True):
+        rebuild_ledger_month(db, project_id, month)
+
+
+def slices_for_dates(project_id: int | None, dates):
+    return {(project_id, month_start(d)) for d in dates}
+
+
+def slices_for_shift(db: Session, project_id: int, shift_code: str,
+                     from_date: date, to_date: date | None,
+                     for_share: bool = False):
+    """
+    Months holding approved allocations a shift version could price.
+    Called once before locking to find the slices to lock, and again with
+    for_share after the write, which sees months approved meanwhile.
+    """
+    dates = (
+        db.query(ShiftAllocation.shift_date)
+        .filter(
+            ShiftAllocation.project_id == project_id,
+            ShiftAllocation.shift_code == shift_code,
+            ShiftAllocation.shift_date >= from_date,
+            ShiftAllocation.is_approved == True,
+        )
+        .distinct()
+    )
+
+    if to_date is not None:
+        dates = dates.filter(ShiftAllocation.shift_date <= to_date)
+
+    if for_share:
+        dates = dates.with_for_update(read=True)
+
+    return slices_for_dates(project_id, (d for (d,) in dates))
+
+
+def _approved_slices(db: Session, for_share: bool = False):
+    query = (
+        db.query(ShiftAllocation.project_id, ShiftAllocation.shift_date)
+        .filter(ShiftAllocation.is_approved == True)
+        .distinct()
+    )
+    if for_share:
+        query = query.with_for_update(read=True)
+
+    return {(project_id, month_start(d)) for project_id, d in query}
+
+
+def rebuild_all(db: Session):
+    """Recompute the whole ledger, e.g. for reconciliation."""
+    # Every slice ever rebuilt has a lock row, so this covers all ledger
+    # rows the delete below can reach
+    held = set(
+        db.query(AllowanceLedgerLock.project_id, AllowanceLedgerLock.month)
+    )
+    lock_ledger(db, _approved_slices(db) | held)
+    db.query(AllowanceLedger).delete(synchronize_session=False)
+
+    # Read again under lock: months approved since the first read are
+    # locked here and rebuilt with the rest
+    slices = lock_ledger(db, _approved_slices(db, for_share=True))
+    for project_id, month in slices:
+        rebuild_ledger_month(db, project_id, month)
+
+    return len(slices)
+
+
+def ledger_groups(db: Session, project_id: int, first: date, last: date):
+    """
+    (names, groups) for build_employee_rows from the ledger, summed over
+    the months from first to last inclusive. One row per employee and
+    (shift_code, day_type).
+    """
+    rows = (
+        db.query(
+            AllowanceLedger.emp_id,
+            Employee.emp_name,
+            Employee.emp_lname,
+            AllowanceLedger.shift_code,
+            AllowanceLedger.day_type,
+            func.sum(AllowanceLedger.shift_count),
+            func.sum(AllowanceLedger.total_allowance),
+        )
+        .join(Employee, Employee.emp_id == AllowanceLedger.emp_id)
+        .filter(
+            AllowanceLedger.project_id == project_id,
+            AllowanceLedger.month.between(first, last),
+        )
+        .group_by(
+            AllowanceLedger.emp_id,
+            Employee.emp_name,
+            Employee.emp_lname,
+            AllowanceLedger.shift_code,
+            AllowanceLedger.day_type,
+        )
+        .order_by(AllowanceLedger.emp_id, AllowanceLedger.shift_code)
+        .all()
+    )
+
+    names = {}
+    groups = []
+    for emp_id, emp_name, emp_lname, shift_code, day_type, count, total in rows:
+        names.setdefault(emp_id, (emp_name, emp_lname))
+        groups.append((
+            emp_id, shift_code, day_type, int(count), Decimal(str(total or 0))
+        ))
+
+    return names, groups
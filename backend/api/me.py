@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 
-from models.database import get_db
+from models.database import get_async_db
 from models.models import (
     Project,
     ProjectLead,
@@ -9,45 +9,51 @@ from models.models import (
     Employee,
     ProjectEmployee,
 )
-from api.dependencies import get_current_user , get_current_employee 
+from api.dependencies import get_current_user_async
 
 router = APIRouter(prefix="/me", tags=["Me"])
 
 
 @router.get("/context")
-def get_my_context(
-    user=Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def get_my_context(
+    user=Depends(get_current_user_async),
+    db=Depends(get_async_db),
 ):
 
     # LEAD CONTEXT
     if isinstance(user, ProjectLead):
 
         if user.is_admin:
-            projects = db.query(Project).filter(Project.is_active == True).all()
+            projects = (
+                await db.execute(
+                    select(Project).where(Project.is_active == True)
+                )
+            ).scalars().all()
         else:
 
             assigned_projects = (
-                db.query(Project)
-                .join(ProjectLeadAssignment)
-                .filter(
-                    ProjectLeadAssignment.lead_id == user.lead_id,
-                    Project.is_active == True,
+                await db.execute(
+                    select(Project)
+                    .join(ProjectLeadAssignment)
+                    .where(
+                        ProjectLeadAssignment.lead_id == user.lead_id,
+                        Project.is_active == True,
+                    )
                 )
-                .all()
-            )
+            ).scalars().all()
 
             team_names = {p.team_name for p in assigned_projects}
 
             projects = (
-                db.query(Project)
-                .filter(
-                    Project.team_name.in_(team_names),
-                    Project.is_active == True
+                await db.execute(
+                    select(Project)
+                    .where(
+                        Project.team_name.in_(team_names),
+                        Project.is_active == True
+                    )
+                    .order_by(Project.name)
                 )
-                .order_by(Project.name)
-                .all()
-            )
+            ).scalars().all()
 
         return {
             "user_type": "lead",
@@ -68,14 +74,15 @@ def get_my_context(
     elif isinstance(user, Employee):
 
         assigned_projects = (
-            db.query(Project)
-            .join(ProjectEmployee)
-            .filter(
-                ProjectEmployee.emp_id == user.emp_id,
-                Project.is_active == True,
+            await db.execute(
+                select(Project)
+                .join(ProjectEmployee)
+                .where(
+                    ProjectEmployee.emp_id == user.emp_id,
+                    Project.is_active == True,
+                )
             )
-            .all()
-        )
+        ).scalars().all()
 
         if not assigned_projects:
             return {
@@ -89,14 +96,15 @@ def get_my_context(
         team_names = {p.team_name for p in assigned_projects}
 
         projects = (
-            db.query(Project)
-            .filter(
-                Project.team_name.in_(team_names),
-                Project.is_active == True,
+            await db.execute(
+                select(Project)
+                .where(
+                    Project.team_name.in_(team_names),
+                    Project.is_active == True,
+                )
+                .order_by(Project.name)
             )
-            .order_by(Project.name)
-            .all()
-        )
+        ).scalars().all()
         return {
             "user_type": "employee",
             "emp_id": user.emp_id,
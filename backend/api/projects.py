@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from models.database import get_db
 from models.models import Project , ProjectLead , ProjectLeadAssignment
-from api.dependencies import get_current_lead
+from api.dependencies import get_current_lead, invalidate_access_index
+from utils.http_cache import etag_matches, make_etag, not_modified
 from models.schemas import (
     ProjectCreateRequest, 
     ProjectUpdateRequest,
@@ -17,39 +20,75 @@ router = APIRouter(
 
 # List projects
 @router.get("/")
-def list_projects(db: Session = Depends(get_db)):
+def list_projects(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    # Leads come back on the same rows, so the page costs one query
+    # however many projects it holds
     projects = (
-        db.query(Project)
+        db.query(Project.project_id)
         .filter(Project.is_active == True)
-        .order_by(Project.name)
-        .all()
+        .order_by(Project.name, Project.project_id)
     )
 
-    result = []
+    if limit is not None:
+        projects = projects.limit(limit).offset(offset)
 
-    for p in projects:
-        leads = (
-            db.query(ProjectLead)
-            .join(ProjectLeadAssignment,
-                  ProjectLeadAssignment.lead_id == ProjectLead.lead_id)
-            .filter(ProjectLeadAssignment.project_id == p.project_id)
-            .all()
+    page = projects.subquery()
+
+    rows = (
+        db.query(
+            Project.project_id,
+            Project.name,
+            Project.team_name,
+            Project.is_active,
+            ProjectLead.lead_id,
+            ProjectLead.lead_name,
+        )
+        .join(page, page.c.project_id == Project.project_id)
+        .outerjoin(
+            ProjectLeadAssignment,
+            ProjectLeadAssignment.project_id == Project.project_id,
+        )
+        .outerjoin(
+            ProjectLead,
+            ProjectLead.lead_id == ProjectLeadAssignment.lead_id,
         )
+        .order_by(Project.name, Project.project_id, ProjectLeadAssignment.id)
+        .all()
+    )
+
+    result = {}
+
+    for project_id, name, team_name, is_active, lead_id, lead_name in rows:
+        project = result.get(project_id)
+
+        if project is None:
+            project = result[project_id] = {
+                "project_id": project_id,
+                "name": name,
+                "team_name": team_name.upper(),
+                "is_active": is_active,
+                "leads": [],
+            }
+
+        if lead_id is not None:
+            project["leads"].append({
+                "lead_id": lead_id,
+                "name": lead_name
+            })
+
+    result = list(result.values())
 
-        result.append({
-            "project_id": p.project_id,
-            "name": p.name,
-            "team_name": p.team_name.upper(),
-            "is_active": p.is_active,
-            "leads": [
-                {
-                    "lead_id": l.lead_id,
-                    "name": l.lead_name
-                }
-                for l in leads
-            ]
-        })
+    etag = make_etag(result)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
+    response.headers["ETag"] = etag
     return result
 
 # Create project 
@@ -77,6 +116,7 @@ def create_project(
         ))
 
     db.commit()
+    invalidate_access_index()
     db.refresh(project)
 
     return project
@@ -110,6 +150,7 @@ def update_project(
         ))
 
     db.commit()
+    invalidate_access_index()
     return project
 
 
@@ -125,6 +166,7 @@ def delete_project(
 
     project.is_active = False
     db.commit()
+    invalidate_access_index()
 
     return {"status": "deactivated"}
 
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session , joinedload
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, insert, select, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 
 from datetime import date, datetime , timedelta
 import pytz 
-from models.database import get_db
+from models.database import get_db, get_async_db
+from models.scan import scan_async
 from models.models import (
     ProjectLead,
     ProjectEmployee,
@@ -17,16 +19,33 @@ from models.schemas import (
     ShiftBatchRequest,
     ProjectShiftCreateRequest,
 )
-from api.dependencies import get_current_lead, get_project_or_403 , get_holidays_map ,get_current_user
+from api.dependencies import (
+    get_current_lead,
+    get_project_or_403,
+    get_holidays_map,
+    get_current_user,
+    get_current_user_async,
+    check_project_access_async,
+    data_version_stmt,
+)
+from api.ledger import (
+    lock_ledger,
+    refresh_ledger,
+    slices_for_dates,
+    slices_for_shift,
+)
+from utils.http_cache import etag_matches, not_modified, request_etag
+from utils.responses import FastJSONResponse
 
+# Every route authenticates itself: /weekly must not pull in a sync
+# session through a router-level get_current_user.
 router = APIRouter(
     prefix="/shifts",
     tags=["Shifts"],
-    dependencies=[Depends(get_current_user)],
 )
 ist = pytz.timezone('Asia/Kolkata') 
 
-@router.get("/masters")
+@router.get("/masters", dependencies=[Depends(get_current_user)])
 def get_shifts(
     project_id: int,
     on_date: date | None = None,
@@ -85,111 +104,132 @@ def get_project_shift_history(
     ]
 
 
-@router.get("/weekly")
-def get_weekly_allocation(
+@router.get("/weekly", response_class=FastJSONResponse)
+async def get_weekly_allocation(
+    request: Request,
     project_id: int,
     from_date: date,
     to_date: date,
-    db: Session = Depends(get_db),
-    user = Depends(get_current_user),
+    db=Depends(get_async_db),
+    user = Depends(get_current_user_async),
 ):
 
     # ───────── ACCESS CONTROL ─────────
     if isinstance(user, ProjectLead):
-        get_project_or_403(project_id, user, db)
+        await check_project_access_async(project_id, user, db)
 
     elif isinstance(user, Employee):
-        mapping = (
-            db.query(ProjectEmployee)
-            .filter(
+        mapping = await db.scalar(
+            select(ProjectEmployee.id)
+            .where(
                 ProjectEmployee.project_id == project_id,
                 ProjectEmployee.emp_id == user.emp_id,
             )
-            .first()
+            .limit(1)
         )
         if not mapping:
             raise HTTPException(403, "Not authorized")
 
     else:
         raise HTTPException(403, "Unauthorized user")
-    
-    # print("USER TYPE:", type(user))
-    
-    allocations = (
-        db.query(ShiftAllocation)
-        .options(
-            joinedload(ShiftAllocation.employee),
-            joinedload(ShiftAllocation.approver),
-        )
-        .filter(
-            ShiftAllocation.project_id == project_id,
-            ShiftAllocation.shift_date.between(from_date, to_date),
-        )
-        .all()
-    )
-    # for alloc in allocations:
-            # print(
-            #     "DATE:", alloc.shift_date,
-            #     "APPROVED:", alloc.is_approved,
-            #     "APPROVED_BY:", alloc.approved_by
-            # )
+
+    # Polling clients revalidate against a cheap fingerprint of the scope
+    version = (
+        await db.execute(data_version_stmt([project_id], from_date, to_date))
+    ).one()
+    etag = request_etag(request, tuple(version))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     holidays = (
-        db.query(ProjectHoliday)
-        .filter(
-            ProjectHoliday.holiday_date.between(from_date, to_date),
-            or_(
-                ProjectHoliday.project_id == project_id,
-                ProjectHoliday.project_id.is_(None),
-            ),
+        await db.execute(
+            select(
+                ProjectHoliday.holiday_date,
+                ProjectHoliday.holiday_name,
+                ProjectHoliday.project_id,
+            )
+            .where(
+                ProjectHoliday.holiday_date.between(from_date, to_date),
+                or_(
+                    ProjectHoliday.project_id == project_id,
+                    ProjectHoliday.project_id.is_(None),
+                ),
+            )
         )
-        .all()
-    )
+    ).all()
 
     holiday_map = {}
-    for h in holidays:
-        d = h.holiday_date.isoformat()
-        holiday_map[d] = {
+    for holiday_date, holiday_name, holiday_project in holidays:
+        holiday_map[holiday_date.isoformat()] = {
             "is_holiday": True,
-            "holiday_name": h.holiday_name,
-            "scope": "project" if h.project_id else "company",
+            "holiday_name": holiday_name,
+            "scope": "project" if holiday_project else "company",
         }
 
-    result = {}
-
-    for alloc in allocations:
-
-        d = alloc.shift_date.isoformat()
-
-        result.setdefault(d, {
-            "shifts": {},
-            "is_approved": True,
-            "approved_by": None,
-            "last_updated": None,
-            **holiday_map.get(d, {"is_holiday": False}),
-        })
+    # Plain column tuples: no identity map or relationship loading.
+    # Scanned last, after the holiday lookup, as it holds the connection.
+    allocations = scan_async(
+        db,
+        select(
+            ShiftAllocation.allocation_id,
+            ShiftAllocation.shift_date,
+            ShiftAllocation.shift_code,
+            ShiftAllocation.emp_id,
+            ShiftAllocation.project_id,
+            ShiftAllocation.is_approved,
+            ShiftAllocation.last_updated,
+            Employee.emp_name,
+            Employee.emp_lname,
+            ProjectLead.lead_name,
+        )
+        .join(Employee, Employee.emp_id == ShiftAllocation.emp_id)
+        .outerjoin(
+            ProjectLead, ProjectLead.lead_id == ShiftAllocation.approved_by
+        )
+        .where(
+            ShiftAllocation.project_id == project_id,
+            ShiftAllocation.shift_date.between(from_date, to_date),
+        )
+        .order_by(ShiftAllocation.shift_date, ShiftAllocation.allocation_id)
+    )
 
-        if not alloc.is_approved:
-            result[d]["is_approved"] = False
-
-        if (
-            result[d]["last_updated"] is None
-            or alloc.last_updated > result[d]["last_updated"]
-        ):
-            result[d]["last_updated"] = alloc.last_updated
-
-        # Approver from relationship
-        if alloc.is_approved and alloc.approver:
-            result[d]["approved_by"] = alloc.approver.lead_name
-
-        result[d]["shifts"].setdefault(
-            alloc.shift_code, []
-        ).append({
-            "allocation_id": alloc.allocation_id,
-            "emp_id": alloc.emp_id,
-            "emp_name": alloc.employee.emp_name,
-            "emp_lname": alloc.employee.emp_lname,
-            "project_id": alloc.project_id,
-            "is_approved": alloc.is_approved,
+    result = {}
+    day = None
+    current_date = None
+
+    async for (
+        allocation_id, shift_date, shift_code, emp_id, alloc_project,
+        is_approved, last_updated, emp_name, emp_lname, approver_name,
+    ) in allocations:
+
+        # Rows arrive ordered by date, so each day is looked up once
+        if shift_date != current_date:
+            current_date = shift_date
+            d = shift_date.isoformat()
+            day = result[d] = {
+                "shifts": {},
+                "is_approved": True,
+                "approved_by": None,
+                "last_updated": None,
+                **holiday_map.get(d, {"is_holiday": False}),
+            }
+
+        if not is_approved:
+            day["is_approved"] = False
+
+        if day["last_updated"] is None or last_updated > day["last_updated"]:
+            day["last_updated"] = last_updated
+
+        if is_approved and approver_name is not None:
+            day["approved_by"] = approver_name
+
+        day["shifts"].setdefault(shift_code, []).append({
+            "allocation_id": allocation_id,
+            "emp_id": emp_id,
+            "emp_name": emp_name,
+            "emp_lname": emp_lname,
+            "project_id": alloc_project,
+            "is_approved": is_approved,
         })
 
     # Ensure holiday-only dates appear
@@ -202,7 +242,7 @@ def get_weekly_allocation(
             **h,
         })
 
-    return result
+    return FastJSONResponse(result, headers={"ETag": etag})
 
 @router.get("/employees/available")
 def get_available_employees(
@@ -236,6 +276,76 @@ def get_available_employees(
 
     return [{"emp_id": e.emp_id, "emp_name": e.emp_name} for e in employees]
 
+def _insert_allocations(db: Session, rows: list[dict]) -> set:
+    """
+    Insert new allocations in one executemany. Rows that a concurrent
+    request inserted after our probe are skipped via
+    uq_emp_project_shift_day where the dialect allows it; their
+    (emp_id, shift_code, shift_date) keys are returned. Any other
+    constraint violation fails the statement.
+    """
+    if not rows:
+        return set()
+
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mssql":
+        db.execute(
+            text(
+                "MERGE shift_allocation WITH (HOLDLOCK) AS t "
+                "USING (SELECT :emp_id AS emp_id, :project_id AS project_id, "
+                ":shift_code AS shift_code, :shift_date AS shift_date) AS s "
+                "ON t.emp_id = s.emp_id AND t.project_id = s.project_id "
+                "AND t.shift_code = s.shift_code AND t.shift_date = s.shift_date "
+                "WHEN NOT MATCHED THEN INSERT "
+                "(emp_id, project_id, shift_code, shift_date, is_approved, "
+                "approved_by, last_updated) "
+                "VALUES (s.emp_id, s.project_id, s.shift_code, s.shift_date, "
+                ":is_approved, :approved_by, :last_updated);"
+            ),
+            rows,
+        )
+        return set()
+
+    if dialect != "mysql":
+        db.execute(insert(ShiftAllocation), rows)
+        return set()
+
+    # Unlike INSERT IGNORE, a no-op ON DUPLICATE KEY UPDATE only skips
+    # duplicate keys; FK, range and truncation errors still raise.
+    stmt = mysql_insert(ShiftAllocation)
+    stmt = stmt.on_duplicate_key_update(
+        allocation_id=ShiftAllocation.allocation_id
+    )
+    result = db.execute(stmt, rows)
+
+    # SQLAlchemy connects with CLIENT_FOUND_ROWS, so a skipped duplicate
+    # counts one like an insert: every row must be accounted for.
+    if result.rowcount != len(rows):
+        raise HTTPException(
+            500,
+            f"Allocation insert affected {result.rowcount} of {len(rows)} rows",
+        )
+
+    # Our snapshot predates a concurrent insert, so only the rows this
+    # statement inserted are visible; the missing keys were skipped.
+    keys = {(r["emp_id"], r["shift_code"], r["shift_date"]) for r in rows}
+    inserted = set(
+        db.query(
+            ShiftAllocation.emp_id,
+            ShiftAllocation.shift_code,
+            ShiftAllocation.shift_date,
+        )
+        .filter(
+            ShiftAllocation.project_id == rows[0]["project_id"],
+            ShiftAllocation.emp_id.in_({r["emp_id"] for r in rows}),
+            ShiftAllocation.shift_date.in_({r["shift_date"] for r in rows}),
+        )
+        .all()
+    )
+    return keys - inserted
+
+
 @router.post("/apply-batch")
 def apply_shift_batch(
     payload: ShiftBatchRequest,
@@ -244,53 +354,133 @@ def apply_shift_batch(
 ):
     get_project_or_403(payload.project_id, lead, db)
 
+    # One UPDATE per approval state; the last entry for a date wins
+    approval_dates = {}
+    for a in payload.approvals:
+        approval_dates[a.date] = a.is_approved
+
+    # Lock the months this batch can reprice: new rows start unapproved,
+    # so only removals and approval changes count
+    remove_dates = set()
+    if payload.remove:
+        remove_dates = {
+            d for (d,) in db.query(ShiftAllocation.shift_date)
+            .filter(
+                ShiftAllocation.allocation_id.in_(payload.remove),
+                ShiftAllocation.project_id == payload.project_id,
+            )
+            .distinct()
+        }
+    lock_ledger(
+        db, slices_for_dates(payload.project_id, remove_dates | set(approval_dates))
+    )
+
+    # Ledger months touched by approved rows that change state
+    ledger_dates = set()
+
+    removed = 0
     if payload.remove:
-        db.query(ShiftAllocation).filter(
+        # Approval can only change under the slice lock we now hold
+        ledger_dates.update(
+            d for (d,) in db.query(ShiftAllocation.shift_date)
+            .filter(
+                ShiftAllocation.allocation_id.in_(payload.remove),
+                ShiftAllocation.project_id == payload.project_id,
+                ShiftAllocation.is_approved == True,
+            )
+            .distinct()
+            .with_for_update()
+        )
+        removed = db.query(ShiftAllocation).filter(
             ShiftAllocation.allocation_id.in_(payload.remove),
             ShiftAllocation.project_id == payload.project_id,
         ).delete(synchronize_session=False)
 
-
-    for a in payload.add:
-        exists = (
-            db.query(ShiftAllocation)
+    # One existence probe for every requested (emp, code, date)
+    existing = set()
+    if payload.add:
+        existing = set(
+            db.query(
+                ShiftAllocation.emp_id,
+                ShiftAllocation.shift_code,
+                ShiftAllocation.shift_date,
+            )
             .filter(
                 ShiftAllocation.project_id == payload.project_id,
-                ShiftAllocation.emp_id == a.emp_id,
-                ShiftAllocation.shift_code == a.shift_code,
-                ShiftAllocation.shift_date == a.shift_date,
+                ShiftAllocation.emp_id.in_({a.emp_id for a in payload.add}),
+                ShiftAllocation.shift_date.in_({a.shift_date for a in payload.add}),
             )
-            .first()
+            .all()
         )
 
-        if exists:
-            continue  
+    now = datetime.now(ist)
+    added = []
+    new_rows = []
+    batch_keys = set()
 
-        db.add(
-            ShiftAllocation(
-                project_id=payload.project_id,
-                emp_id=a.emp_id,
-                shift_code=a.shift_code,
-                shift_date=a.shift_date,
-                is_approved=False,
-            )
-        )
+    for a in payload.add:
+        key = (a.emp_id, a.shift_code, a.shift_date)
+
+        if key in existing:
+            status = "exists"
+        elif key in batch_keys:
+            status = "duplicate"
+        else:
+            batch_keys.add(key)
+            status = "inserted"
+            new_rows.append({
+                "project_id": payload.project_id,
+                "emp_id": a.emp_id,
+                "shift_code": a.shift_code,
+                "shift_date": a.shift_date,
+                "is_approved": False,
+                "approved_by": None,
+                "last_updated": now,
+            })
+
+        added.append({
+            "emp_id": a.emp_id,
+            "shift_code": a.shift_code,
+            "shift_date": a.shift_date,
+            "status": status,
+        })
 
-    for a in payload.approvals:
-        db.query(ShiftAllocation).filter(
+    skipped = _insert_allocations(db, new_rows)
+    for item in added:
+        if item["status"] == "inserted" and (
+            item["emp_id"], item["shift_code"], item["shift_date"]
+        ) in skipped:
+            item["status"] = "exists"
+
+    approved = 0
+    for is_approved in (True, False):
+        dates = [d for d, flag in approval_dates.items() if flag is is_approved]
+        if not dates:
+            continue
+
+        ledger_dates.update(dates)
+
+        approved += db.query(ShiftAllocation).filter(
             ShiftAllocation.project_id == payload.project_id,
-            ShiftAllocation.shift_date == a.date,
+            ShiftAllocation.shift_date.in_(dates),
         ).update(
             {
-                ShiftAllocation.is_approved: a.is_approved,
-                ShiftAllocation.last_updated: datetime.now(ist),
-                ShiftAllocation.approved_by: lead.lead_id if a.is_approved else None,
+                ShiftAllocation.is_approved: is_approved,
+                ShiftAllocation.last_updated: now,
+                ShiftAllocation.approved_by: lead.lead_id if is_approved else None,
             },
             synchronize_session=False,
         )
 
+    refresh_ledger(db, slices_for_dates(payload.project_id, ledger_dates))
+
     db.commit()
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "added": added,
+        "removed": removed,
+        "approval_rows": approved,
+    }
 
 @router.post("/projects/{project_id}/shifts")
 def create_project_shift(
@@ -300,6 +490,9 @@ def create_project_shift(
     lead=Depends(get_current_lead),
 ):
     get_project_or_403(project_id, lead, db)
+    lock_ledger(db, slices_for_shift(
+        db, project_id, data.shift_code, data.effective_from, None
+    ))
 
     # Check duplicate effective_from for same shift_code
     exists = db.query(ProjectShiftMaster).filter(
@@ -327,6 +520,10 @@ def create_project_shift(
     )
 
     db.add(new_shift)
+    refresh_ledger(db, slices_for_shift(
+        db, project_id, data.shift_code, data.effective_from, None,
+        for_share=True,
+    ))
     db.commit()
 
     return {"status": "created"}
@@ -366,6 +563,9 @@ def update_project_shift(
     lead = Depends(get_current_lead),
 ):
     get_project_or_403(project_id, lead, db)
+    lock_ledger(db, slices_for_shift(
+        db, project_id, shift_code, data.effective_from, None
+    ))
 
     current = db.query(ProjectShiftMaster).filter(
         ProjectShiftMaster.project_id == project_id,
@@ -398,6 +598,10 @@ def update_project_shift(
     )
 
     db.add(new_shift)
+    refresh_ledger(db, slices_for_shift(
+        db, project_id, shift_code, data.effective_from, None,
+        for_share=True,
+    ))
     db.commit()
 
     return {"status": "versioned"}
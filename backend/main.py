@@ -1,28 +1,54 @@
 import os
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from models.database import engine
-from models.models import Base
-from api import auth, shifts, employee, me , projects ,assignments , holidays ,allowance
+from migrations import check_schema_version
+from utils.mail_queue import mail_dispatcher
+from utils.latency import windows, request_bucket
+from utils import passwords
+from utils.jobs import report_jobs
+from api import auth, shifts, employee, me , projects ,assignments , holidays ,allowance, admin
 
 load_dotenv()
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(redirect_slashes=False)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # DDL runs as a deploy step (python -m migrations upgrade); workers
+    # only verify the schema version.
+    check_schema_version(engine)
+    yield
+    mail_dispatcher.stop()
+    passwords.shutdown()
+    report_jobs.shutdown()
+
+
+app = FastAPI(redirect_slashes=False, lifespan=lifespan)
 
 cors_origins = os.getenv("CORS_ORIGINS", "")
 
 origins = [origin.strip() for origin in cors_origins.split(",") if origin]
 
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    windows[request_bucket(request.url.path)].observe(time.perf_counter() - start)
+    return response
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,       
     allow_credentials=True,       
     allow_methods=["*"],
     allow_headers=["*"],     
+    # Paging cursor and cache validator are read by the frontend
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.include_router(auth.router)
@@ -33,4 +59,5 @@ app.include_router(assignments.router)
 app.include_router(projects.router)
 app.include_router(holidays.router)
 app.include_router(allowance.router)
+app.include_router(admin.router)
 
@@ -0,0 +1,111 @@
+"""
+Versioned schema migrations, run as a deploy step:
+
+    python -m migrations upgrade
+
+Each module in migrations/versions defines VERSION, DESCRIPTION and
+upgrade(conn). Applied versions are recorded in schema_version; app
+workers only compare that against LATEST_VERSION on startup.
+"""
+import datetime
+import importlib
+import os
+import pkgutil
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, func, inspect, select,
+)
+
+from migrations import versions as _versions_pkg
+
+metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def load_migrations():
+    modules = [
+        importlib.import_module(f"{_versions_pkg.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(_versions_pkg.__path__)
+    ]
+    return sorted(modules, key=lambda m: m.VERSION)
+
+
+MIGRATIONS = load_migrations()
+LATEST_VERSION = MIGRATIONS[-1].VERSION if MIGRATIONS else 0
+
+
+def current_version(conn) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(engine, target: int | None = None):
+    target = LATEST_VERSION if target is None else target
+
+    with engine.begin() as conn:
+        metadata.create_all(conn)
+
+    for migration in MIGRATIONS:
+        if migration.VERSION > target:
+            break
+
+        # One transaction per version so a failure leaves a clean stamp
+        with engine.begin() as conn:
+            if migration.VERSION <= current_version(conn):
+                continue
+
+            print(f"Applying {migration.VERSION}: {migration.DESCRIPTION}")
+            migration.upgrade(conn)
+            conn.execute(
+                schema_version.insert().values(
+                    version=migration.VERSION,
+                    description=migration.DESCRIPTION,
+                    applied_at=datetime.datetime.utcnow(),
+                )
+            )
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def check_schema_version(engine):
+    """
+    Startup check: one SELECT against schema_version. SCHEMA_CHECK=warn
+    logs instead of refusing to start, SCHEMA_CHECK=off skips it.
+    """
+    mode = os.getenv("SCHEMA_CHECK", "strict").lower()
+    if mode == "off":
+        return
+
+    with engine.connect() as conn:
+        try:
+            version = conn.execute(
+                select(func.max(schema_version.c.version))
+            ).scalar() or 0
+        except Exception:
+            version = 0
+
+    if version >= LATEST_VERSION:
+        return
+
+    message = (
+        f"Database schema is at version {version}, "
+        f"application expects {LATEST_VERSION}. "
+        "Run `python -m migrations upgrade`."
+    )
+
+    if mode == "warn":
+        print("Schema Warning:", message)
+        return
+
+    raise SchemaVersionError(message)
@@ -0,0 +1,24 @@
+import sys
+
+from models.database import engine
+from migrations import LATEST_VERSION, current_version, upgrade
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "upgrade"
+
+    if command == "upgrade":
+        target = int(argv[2]) if len(argv) > 2 else None
+        upgrade(engine, target)
+    elif command == "current":
+        with engine.connect() as conn:
+            print(f"current={current_version(conn)} latest={LATEST_VERSION}")
+    else:
+        print("usage: python -m migrations [upgrade [version] | current]")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,156 @@
+"""
+Baseline schema, frozen as the tables stood before versioned migrations.
+Later changes belong in their own migration, never here: this module
+deliberately does not import models.models.
+
+Existing databases created by the old startup create_all already have
+these tables; checkfirst makes this a no-op for them.
+"""
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, ForeignKey, Integer, MetaData, Numeric,
+    String, Table, Time, UniqueConstraint,
+)
+
+VERSION = 1
+DESCRIPTION = "Initial schema"
+
+metadata = MetaData()
+
+Table(
+    "user",
+    metadata,
+    Column("user_id", Integer, primary_key=True, autoincrement=True),
+    Column("first_name", String(50), nullable=False),
+    Column("last_name", String(50)),
+    Column("email", String(50), unique=True, nullable=False),
+    Column("passhash", String(255)),
+    Column("role", String(20), nullable=False),
+    Column("reporting_to", Integer, ForeignKey("user.user_id"), nullable=True),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "project_lead",
+    metadata,
+    Column("lead_id", Integer, primary_key=True),
+    Column("lead_name", String(50), nullable=False),
+    Column("lead_lname", String(50), nullable=False),
+    Column("email", String(50), unique=True, nullable=False),
+    Column("passhash", String(255), nullable=False),
+    Column("is_active", Boolean),
+    Column("is_admin", Boolean),
+    Column("otp_code", String(10)),
+    Column("otp_expiry", DateTime),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "employee",
+    metadata,
+    Column("emp_id", Integer, primary_key=True, index=True),
+    Column("emp_name", String(50), nullable=False),
+    Column("emp_lname", String(50), nullable=False),
+    Column("email", String(50), unique=True, nullable=False),
+    Column("passhash", String(255)),
+    Column("is_experienced", Boolean),
+    Column("is_active", Boolean),
+    Column("reporting_to", Integer, ForeignKey("project_lead.lead_id")),
+)
+
+Table(
+    "project",
+    metadata,
+    Column("project_id", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("team_name", String(100), nullable=False),
+    Column("is_active", Boolean),
+    Column("last_updated", DateTime),
+)
+
+Table(
+    "project_lead_assignment",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("project_id", Integer, ForeignKey("project.project_id")),
+    Column("lead_id", Integer, ForeignKey("project_lead.lead_id")),
+)
+
+Table(
+    "project_employee",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column(
+        "project_id", Integer, ForeignKey("project.project_id"), nullable=False
+    ),
+    Column("emp_id", Integer, ForeignKey("employee.emp_id"), nullable=False),
+)
+
+Table(
+    "shift_allocation",
+    metadata,
+    Column("allocation_id", Integer, primary_key=True, autoincrement=True),
+    Column("emp_id", Integer, ForeignKey("employee.emp_id"), nullable=False),
+    Column(
+        "project_id", Integer, ForeignKey("project.project_id"), nullable=False
+    ),
+    Column(
+        "approved_by", Integer, ForeignKey("project_lead.lead_id"), nullable=True
+    ),
+    Column("shift_code", String(20), nullable=False),
+    Column("shift_date", Date, nullable=False),
+    Column("is_approved", Boolean),
+    Column("last_updated", DateTime),
+    UniqueConstraint(
+        "emp_id", "project_id", "shift_code", "shift_date",
+        name="uq_emp_project_shift_day",
+    ),
+)
+
+Table(
+    "project_shift_master",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column(
+        "project_id", Integer, ForeignKey("project.project_id"), nullable=False
+    ),
+    Column("shift_code", String(20), nullable=False),
+    Column("shift_name", String(50), nullable=False),
+    Column("start_time", Time, nullable=False),
+    Column("end_time", Time, nullable=False),
+    Column("weekday_allowance", Numeric(10, 2), nullable=False),
+    Column("weekend_allowance", Numeric(10, 2), nullable=False),
+    Column("effective_from", Date, nullable=False),
+    Column("effective_to", Date),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    UniqueConstraint(
+        "project_id", "shift_code", "effective_from",
+        name="uq_project_shift_effective",
+    ),
+)
+
+Table(
+    "project_holiday",
+    metadata,
+    Column("holiday_id", Integer, primary_key=True, autoincrement=True),
+    Column(
+        "project_id",
+        Integer,
+        ForeignKey("project.project_id", ondelete="CASCADE"),
+        nullable=True,
+    ),
+    Column("holiday_date", Date, nullable=False),
+    Column("holiday_name", String(100), nullable=False),
+    Column("spl_allowance", Numeric(10, 2), nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    UniqueConstraint(
+        "project_id", "holiday_date", name="uq_project_holiday_date"
+    ),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
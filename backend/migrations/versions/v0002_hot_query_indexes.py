@@ -0,0 +1,44 @@
+"""
+Adds the secondary indexes for the hot query shapes. The definitions are
+frozen here rather than read from models.py, so this step creates the
+same indexes however the models change later.
+"""
+from sqlalchemy import Column, Index, MetaData, Table, inspect
+
+VERSION = 2
+DESCRIPTION = "Indexes for hot query shapes"
+
+# table -> [(index name, columns)]
+INDEXES = {
+    "shift_allocation": [
+        ("ix_shift_allocation_project_date", ("project_id", "shift_date")),
+    ],
+    "project_holiday": [
+        ("ix_project_holiday_date", ("holiday_date",)),
+    ],
+    "project_employee": [
+        ("ix_project_employee_project_emp", ("project_id", "emp_id")),
+        ("ix_project_employee_emp", ("emp_id",)),
+    ],
+    "project_lead_assignment": [
+        ("ix_project_lead_assignment_project_lead", ("project_id", "lead_id")),
+        ("ix_project_lead_assignment_lead", ("lead_id",)),
+    ],
+}
+
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    metadata = MetaData()
+
+    for table_name, indexes in INDEXES.items():
+        existing = {ix["name"] for ix in inspector.get_indexes(table_name)}
+
+        # Index DDL only needs the table and column names
+        columns = {c for _, cols in indexes for c in cols}
+        table = Table(table_name, metadata, *(Column(c) for c in sorted(columns)))
+
+        for name, cols in indexes:
+            if name not in existing:
+                print(f"Creating index {name} on {table_name}")
+                Index(name, *(table.c[c] for c in cols)).create(conn)
@@ -0,0 +1,198 @@
+"""
+Adds the allowance_ledger table and fills it from the approved
+allocations already on record. Everything the backfill reads is frozen
+here as of this version, down to the pricing rules, so later model or
+api.ledger changes cannot alter what this migration does.
+"""
+import datetime
+from bisect import bisect_right
+from decimal import Decimal
+
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, ForeignKey, Integer, MetaData, Numeric,
+    String, Table, UniqueConstraint, insert, select,
+)
+
+VERSION = 3
+DESCRIPTION = "Monthly allowance ledger"
+
+INSERT_BATCH = 1000
+
+metadata = MetaData()
+
+# Referenced tables only need their key columns for the FK DDL
+Table("project", metadata, Column("project_id", Integer, primary_key=True))
+Table("employee", metadata, Column("emp_id", Integer, primary_key=True))
+
+# Read-only inputs: just the columns the backfill reads
+shift_allocation = Table(
+    "shift_allocation",
+    metadata,
+    Column("allocation_id", Integer, primary_key=True),
+    Column("emp_id", Integer),
+    Column("project_id", Integer),
+    Column("shift_code", String(20)),
+    Column("shift_date", Date),
+    Column("is_approved", Boolean),
+)
+
+project_shift_master = Table(
+    "project_shift_master",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("project_id", Integer),
+    Column("shift_code", String(20)),
+    Column("weekday_allowance", Numeric(10, 2)),
+    Column("weekend_allowance", Numeric(10, 2)),
+    Column("effective_from", Date),
+    Column("effective_to", Date),
+    Column("is_active", Boolean),
+)
+
+project_holiday = Table(
+    "project_holiday",
+    metadata,
+    Column("holiday_id", Integer, primary_key=True),
+    Column("project_id", Integer),
+    Column("holiday_date", Date),
+)
+
+allowance_ledger = Table(
+    "allowance_ledger",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column(
+        "project_id", Integer, ForeignKey("project.project_id"), nullable=False
+    ),
+    Column("month", Date, nullable=False),
+    Column("emp_id", Integer, ForeignKey("employee.emp_id"), nullable=False),
+    Column("shift_code", String(20), nullable=False),
+    Column("day_type", String(10), nullable=False),
+    Column("shift_count", Integer, nullable=False),
+    Column("total_allowance", Numeric(12, 2), nullable=False),
+    Column("updated_at", DateTime),
+    UniqueConstraint(
+        "project_id", "month", "emp_id", "shift_code", "day_type",
+        name="uq_allowance_ledger_slice",
+    ),
+)
+
+
+def _load_shifts(conn):
+    """Active versions per (project_id, shift_code), by effective_from."""
+    versions = {}
+    for row in conn.execute(
+        select(
+            project_shift_master.c.project_id,
+            project_shift_master.c.shift_code,
+            project_shift_master.c.weekday_allowance,
+            project_shift_master.c.weekend_allowance,
+            project_shift_master.c.effective_from,
+            project_shift_master.c.effective_to,
+        )
+        .where(project_shift_master.c.is_active == True)
+        .order_by(project_shift_master.c.effective_from)
+    ):
+        versions.setdefault((row.project_id, row.shift_code), []).append(row)
+
+    starts = {
+        key: [v.effective_from for v in rows] for key, rows in versions.items()
+    }
+    return versions, starts
+
+
+def _load_holidays(conn):
+    """(company-wide dates, {project_id: dates})."""
+    company = set()
+    by_project = {}
+    for project_id, holiday_date in conn.execute(
+        select(project_holiday.c.project_id, project_holiday.c.holiday_date)
+    ):
+        if project_id is None:
+            company.add(holiday_date)
+        else:
+            by_project.setdefault(project_id, set()).add(holiday_date)
+    return company, by_project
+
+
+def _day_type(day, project_id, company, by_project):
+    # Weekends take precedence over holidays
+    if day.weekday() >= 5:
+        return "Weekend"
+    if day in company or day in by_project.get(project_id, ()):
+        return "Holiday"
+    return "Weekday"
+
+
+def _resolve(versions, starts, project_id, shift_code, day):
+    key = (project_id, shift_code)
+    if key not in versions:
+        return None
+
+    i = bisect_right(starts[key], day) - 1
+    if i < 0:
+        return None
+
+    shift = versions[key][i]
+    if shift.effective_to is not None and shift.effective_to < day:
+        return None
+    return shift
+
+
+def backfill(conn) -> int:
+    versions, starts = _load_shifts(conn)
+    company, by_project = _load_holidays(conn)
+
+    # (project_id, month, emp_id, shift_code, day_type) -> [count, total]
+    totals = {}
+    for project_id, emp_id, shift_code, shift_date in conn.execute(
+        select(
+            shift_allocation.c.project_id,
+            shift_allocation.c.emp_id,
+            shift_allocation.c.shift_code,
+            shift_allocation.c.shift_date,
+        ).where(shift_allocation.c.is_approved == True)
+    ):
+        shift = _resolve(versions, starts, project_id, shift_code, shift_date)
+        if shift is None:
+            continue
+
+        day_type = _day_type(shift_date, project_id, company, by_project)
+        rate = (
+            shift.weekday_allowance if day_type == "Weekday"
+            else shift.weekend_allowance
+        )
+
+        key = (project_id, shift_date.replace(day=1), emp_id, shift_code, day_type)
+        entry = totals.setdefault(key, [0, Decimal(0)])
+        entry[0] += 1
+        entry[1] += Decimal(str(rate))
+
+    conn.execute(allowance_ledger.delete())
+
+    now = datetime.datetime.utcnow()
+    rows = [
+        {
+            "project_id": project_id,
+            "month": month,
+            "emp_id": emp_id,
+            "shift_code": shift_code,
+            "day_type": day_type,
+            "shift_count": count,
+            "total_allowance": total,
+            "updated_at": now,
+        }
+        for (project_id, month, emp_id, shift_code, day_type), (count, total)
+        in totals.items()
+    ]
+    for i in range(0, len(rows), INSERT_BATCH):
+        conn.execute(insert(allowance_ledger), rows[i:i + INSERT_BATCH])
+
+    return len({(r["project_id"], r["month"]) for r in rows})
+
+
+def upgrade(conn):
+    allowance_ledger.create(conn, checkfirst=True)
+
+    slices = backfill(conn)
+    print(f"Backfilled {slices} ledger slices")
@@ -0,0 +1,33 @@
+"""
+Adds the row_version counter behind the roster and report fingerprints
+to the tables they cover.
+"""
+from sqlalchemy import inspect
+
+VERSION = 4
+DESCRIPTION = "Row version counters"
+
+TABLES = [
+    "project",
+    "shift_allocation",
+    "project_shift_master",
+    "project_holiday",
+]
+
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+
+    # T-SQL has no COLUMN keyword in ALTER TABLE ... ADD
+    add = "ADD" if conn.dialect.name == "mssql" else "ADD COLUMN"
+
+    for table in TABLES:
+        columns = {c["name"] for c in inspector.get_columns(table)}
+        if "row_version" in columns:
+            continue
+
+        print(f"Adding row_version to {table}")
+        conn.exec_driver_sql(
+            f"ALTER TABLE {quote(table)} {add} row_version INTEGER NOT NULL DEFAULT 0"
+        )
@@ -0,0 +1,42 @@
+"""
+Adds report_job, the shared store for background report jobs.
+"""
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table,
+    Text,
+)
+from sqlalchemy.dialects import mysql
+
+VERSION = 5
+DESCRIPTION = "Report jobs"
+
+metadata = MetaData()
+
+# Referenced table only needs its key column for the FK DDL
+Table("project_lead", metadata, Column("lead_id", Integer, primary_key=True))
+
+report_job = Table(
+    "report_job",
+    metadata,
+    Column("job_id", String(32), primary_key=True),
+    Column(
+        "owner_id", Integer, ForeignKey("project_lead.lead_id"), nullable=False
+    ),
+    Column("kind", String(20), nullable=False),
+    Column("params", Text, nullable=False),
+    Column("status", String(10), nullable=False),
+    Column("processed", Integer, nullable=False),
+    Column("total", Integer),
+    Column("error", String(500)),
+    Column("result", Text().with_variant(mysql.LONGTEXT(), "mysql")),
+    Column("created_at", DateTime, nullable=False),
+    Column("started_at", DateTime),
+    Column("finished_at", DateTime),
+    Column("heartbeat_at", DateTime),
+    Index("ix_report_job_owner_created", "owner_id", "created_at"),
+    Index("ix_report_job_status", "status"),
+)
+
+
+def upgrade(conn):
+    report_job.create(conn, checkfirst=True)
@@ -0,0 +1,27 @@
+"""
+Adds access_version, the one-row counter the access index is checked
+against, seeded with its only row.
+"""
+from sqlalchemy import Column, Integer, MetaData, Table, insert, select
+
+VERSION = 6
+DESCRIPTION = "Access index version counter"
+
+metadata = MetaData()
+
+access_version = Table(
+    "access_version",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("version", Integer, nullable=False),
+)
+
+
+def upgrade(conn):
+    access_version.create(conn, checkfirst=True)
+
+    seeded = conn.execute(
+        select(access_version.c.id).where(access_version.c.id == 1)
+    ).first()
+    if seeded is None:
+        conn.execute(insert(access_version).values(id=1, version=0))
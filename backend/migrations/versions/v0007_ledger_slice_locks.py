@@ -0,0 +1,31 @@
+"""
+Adds allowance_ledger_lock, one row per (project, month) ledger slice.
+Writers lock these rows instead of the project row, so edits to
+different months of a project no longer wait on each other. Rows are
+created on first use.
+"""
+from sqlalchemy import Column, Date, ForeignKey, Integer, MetaData, Table
+
+VERSION = 7
+DESCRIPTION = "Ledger slice locks"
+
+metadata = MetaData()
+
+Table("project", metadata, Column("project_id", Integer, primary_key=True))
+
+allowance_ledger_lock = Table(
+    "allowance_ledger_lock",
+    metadata,
+    Column(
+        "project_id",
+        Integer,
+        ForeignKey("project.project_id"),
+        primary_key=True,
+        autoincrement=False,
+    ),
+    Column("month", Date, primary_key=True),
+)
+
+
+def upgrade(conn):
+    allowance_ledger_lock.create(conn, checkfirst=True)
@@ -0,0 +1,37 @@
+"""
+Moves finished report bodies out of report_job.result into
+report_job_chunk, a row per slice of the JSON, so no single statement
+carries a whole report past max_allowed_packet. Results stored so far
+are short-lived, so the old column is dropped rather than copied.
+"""
+from sqlalchemy import (
+    Column, ForeignKey, Integer, MetaData, String, Table, Text, inspect,
+)
+from sqlalchemy.dialects import mysql
+
+VERSION = 8
+DESCRIPTION = "Chunked report job results"
+
+metadata = MetaData()
+
+# Referenced table only needs its key column for the FK DDL
+Table("report_job", metadata, Column("job_id", String(32), primary_key=True))
+
+report_job_chunk = Table(
+    "report_job_chunk",
+    metadata,
+    Column(
+        "job_id", String(32), ForeignKey("report_job.job_id"), primary_key=True
+    ),
+    Column("seq", Integer, primary_key=True, autoincrement=False),
+    Column("data", Text().with_variant(mysql.MEDIUMTEXT(), "mysql"), nullable=False),
+)
+
+
+def upgrade(conn):
+    report_job_chunk.create(conn, checkfirst=True)
+
+    columns = {c["name"] for c in inspect(conn).get_columns("report_job")}
+    if "result" in columns:
+        print("Dropping report_job.result")
+        conn.exec_driver_sql("ALTER TABLE report_job DROP COLUMN result")
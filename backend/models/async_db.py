@@ -0,0 +1,49 @@
+from starlette.concurrency import run_in_threadpool
+
+
+class ThreadedAsyncSession:
+    """
+    Async facade over a synchronous Session, used when DB_ASYNC is off.
+    Each statement runs in the threadpool and its result is buffered, so
+    handlers written against AsyncSession work unchanged.
+    """
+
+    def __init__(self, session):
+        self._session = session
+
+    async def execute(self, statement, params=None):
+        def run():
+            return self._session.execute(statement, params).freeze()
+
+        frozen = await run_in_threadpool(run)
+        return frozen()
+
+    async def stream(self, statement, params=None):
+        result = await run_in_threadpool(self._session.execute, statement, params)
+        return ThreadedAsyncResult(result)
+
+    async def scalar(self, statement, params=None):
+        return await run_in_threadpool(self._session.scalar, statement, params)
+
+    def expunge(self, instance):
+        # No I/O, so no threadpool hop
+        self._session.expunge(instance)
+
+    async def close(self):
+        await run_in_threadpool(self._session.close)
+
+
+class ThreadedAsyncResult:
+    """Minimal AsyncResult stand-in: each partition is fetched in the threadpool."""
+
+    def __init__(self, result):
+        self._result = result
+
+    async def partitions(self, size=None):
+        partitions = self._result.partitions(size)
+
+        while True:
+            partition = await run_in_threadpool(next, partitions, None)
+            if partition is None:
+                return
+            yield partition
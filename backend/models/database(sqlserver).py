@@ -3,6 +3,9 @@ from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from models.async_db import ThreadedAsyncSession
+from models.pool import pool_options, instrument_pool
+
 load_dotenv()
 
 MSSQL_USER = os.getenv("MSSQL_USER")
@@ -16,6 +19,15 @@ DATABASE_URL = (
     f"@{MSSQL_HOST}:{MSSQL_PORT}/{MSSQL_DB}"
     "?driver=ODBC+Driver+17+for+SQL+Server"
 )
+ASYNC_DATABASE_URL = (
+    f"mssql+aioodbc://{MSSQL_USER}:{MSSQL_PASSWORD}"
+    f"@{MSSQL_HOST}:{MSSQL_PORT}/{MSSQL_DB}"
+    "?driver=ODBC+Driver+17+for+SQL+Server"
+)
+
+# Async endpoints use a native AsyncEngine when enabled, otherwise they
+# fall back to the sync engine through the threadpool.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
 
 # For Windows Authentication
 # DATABASE_URL = (
@@ -26,8 +38,9 @@ DATABASE_URL = (
 
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
+    **pool_options(),
 )
+instrument_pool(engine)
 
 SessionLocal = sessionmaker(
     bind=engine,
@@ -35,6 +48,24 @@ SessionLocal = sessionmaker(
     autoflush=False,
 )
 
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        **pool_options(use_async=True),
+    )
+    instrument_pool(async_engine.sync_engine)
+
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
 Base = declarative_base()
 
 
@@ -43,4 +74,17 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        db = ThreadedAsyncSession(SessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
@@ -3,6 +3,9 @@ from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from models.async_db import ThreadedAsyncSession
+from models.pool import pool_options, instrument_pool
+
 load_dotenv()
 
 MYSQL_USER = os.getenv("MYSQL_USER")
@@ -13,19 +16,55 @@ MYSQL_DB = os.getenv("MYSQL_DB")
 DATABASE_URL = (
     f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}"
 )
+ASYNC_DATABASE_URL = (
+    f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}"
+)
+
+# Async endpoints use a native AsyncEngine when enabled, otherwise they
+# fall back to the sync engine through the threadpool.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
 
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True
+    **pool_options()
 )
+instrument_pool(engine)
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        **pool_options(use_async=True)
+    )
+    instrument_pool(async_engine.sync_engine)
+
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        db = ThreadedAsyncSession(SessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,11 +1,29 @@
 from sqlalchemy import (
     Column, Integer, String, DateTime, Boolean,
-    ForeignKey, UniqueConstraint, Date , Numeric , Time
+    ForeignKey, UniqueConstraint, Date , Numeric , Time , Index , Text ,
+    literal_column
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import relationship, deferred
 from models.database import Base
 import datetime
 
+
+def row_version_column():
+    """
+    Counter bumped by every UPDATE of the row. api.dependencies sums it to
+    fingerprint a scope; unlike max(last_updated) it never collides within
+    one clock tick or across out-of-order commits. Deferred so entity
+    queries and responses never carry it.
+    """
+    return deferred(Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        onupdate=literal_column("row_version") + 1,
+    ))
+
 class User(Base):
     __tablename__ = "user"
 
@@ -90,6 +108,7 @@ class Project(Base):
         default=datetime.datetime.utcnow,
         onupdate=datetime.datetime.utcnow
     )
+    row_version = row_version_column()
 
 
 
@@ -100,6 +119,11 @@ class ProjectLeadAssignment(Base):
     project_id = Column(Integer, ForeignKey("project.project_id"))
     lead_id = Column(Integer, ForeignKey("project_lead.lead_id"))
 
+    __table_args__ = (
+        Index("ix_project_lead_assignment_project_lead", "project_id", "lead_id"),
+        Index("ix_project_lead_assignment_lead", "lead_id"),
+    )
+
 
 class ProjectEmployee(Base):
     __tablename__ = "project_employee"
@@ -122,6 +146,11 @@ class ProjectEmployee(Base):
     )
 
 
+    __table_args__ = (
+        Index("ix_project_employee_project_emp", "project_id", "emp_id"),
+        Index("ix_project_employee_emp", "emp_id"),
+    )
+
     employee = relationship("Employee")
     project = relationship("Project")
 
@@ -149,12 +178,15 @@ class ShiftAllocation(Base):
         default=datetime.datetime.utcnow,
         onupdate=datetime.datetime.utcnow
     )
+    row_version = row_version_column()
 
     __table_args__ = (
         UniqueConstraint(
             "emp_id", "project_id", "shift_code", "shift_date",
             name="uq_emp_project_shift_day"
         ),
+        # /weekly and every allowance report scan a project's date range
+        Index("ix_shift_allocation_project_date", "project_id", "shift_date"),
     )
 
     employee = relationship("Employee")
@@ -193,7 +225,10 @@ class ProjectShiftMaster(Base):
         default=datetime.datetime.utcnow,
         onupdate=datetime.datetime.utcnow
     )
+    row_version = row_version_column()
 
+    # The unique constraint doubles as the index for effective-dated
+    # (project_id, shift_code, effective_from) lookups.
     __table_args__ = (
         UniqueConstraint(
             "project_id", "shift_code", "effective_from",
@@ -223,6 +258,7 @@ class ProjectHoliday(Base):
         default=datetime.datetime.utcnow,
         onupdate=datetime.datetime.utcnow
     )
+    row_version = row_version_column()
 
     project = relationship("Project")
     
@@ -233,4 +269,121 @@ class ProjectHoliday(Base):
             name="uq_project_holiday_date"
             
         ),
-    )
\ No newline at end of file
+        # Company-wide holidays (project_id NULL) are looked up by date alone
+        Index("ix_project_holiday_date", "holiday_date"),
+    )
+
+class AllowanceLedger(Base):
+    """
+    Approved allowance per (project, month, employee, shift_code,
+    day_type), derived from shift_allocation. Rebuilt one (project, month)
+    slice at a time by api.ledger whenever its inputs change.
+    """
+    __tablename__ = "allowance_ledger"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    project_id = Column(Integer, ForeignKey("project.project_id"), nullable=False)
+    month = Column(Date, nullable=False)
+    emp_id = Column(Integer, ForeignKey("employee.emp_id"), nullable=False)
+    shift_code = Column(String(20), nullable=False)
+    day_type = Column(String(10), nullable=False)
+
+    shift_count = Column(Integer, nullable=False, default=0)
+    total_allowance = Column(Numeric(12, 2), nullable=False, default=0)
+
+    updated_at = Column(
+        DateTime,
+        default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow
+    )
+
+    __table_args__ = (
+        # Also the lookup index for a project's month range
+        UniqueConstraint(
+            "project_id", "month", "emp_id", "shift_code", "day_type",
+            name="uq_allowance_ledger_slice"
+        ),
+    )
+
+
+class AllowanceLedgerLock(Base):
+    """
+    One row per (project, month) ledger slice, locked FOR UPDATE by every
+    transaction that rebuilds the slice or changes its inputs. Created on
+    first use by api.ledger.lock_ledger.
+    """
+    __tablename__ = "allowance_ledger_lock"
+
+    project_id = Column(
+        Integer,
+        ForeignKey("project.project_id"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    month = Column(Date, primary_key=True)
+
+
+class ReportJob(Base):
+    """
+    A background report run by utils.jobs. Stored here rather than in
+    process memory so any worker can answer for a job another worker
+    accepted, and results outlive the process that computed them.
+    """
+    __tablename__ = "report_job"
+
+    job_id = Column(String(32), primary_key=True)
+    owner_id = Column(
+        Integer,
+        ForeignKey("project_lead.lead_id"),
+        nullable=False
+    )
+
+    kind = Column(String(20), nullable=False)
+    params = Column(Text, nullable=False)          # JSON
+    status = Column(String(10), nullable=False)
+    # queued | running | done | failed
+
+    processed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer)
+    error = Column(String(500))
+
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # Refreshed by the worker that owns the job while it is pending
+    heartbeat_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_report_job_owner_created", "owner_id", "created_at"),
+        Index("ix_report_job_status", "status"),
+    )
+
+
+class ReportJobChunk(Base):
+    """
+    One slice of a finished report job's JSON body, in seq order. Kept
+    well under max_allowed_packet so large reports store and stream
+    without any single oversized statement.
+    """
+    __tablename__ = "report_job_chunk"
+
+    job_id = Column(
+        String(32),
+        ForeignKey("report_job.job_id"),
+        primary_key=True
+    )
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    data = Column(Text().with_variant(mysql.MEDIUMTEXT(), "mysql"), nullable=False)
+
+
+class AccessVersion(Base):
+    """
+    Single-row counter bumped in the same transaction as every write to
+    project or project_lead_assignment. api.dependencies compares it with
+    the version its in-process access index was built from.
+    """
+    __tablename__ = "access_version"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
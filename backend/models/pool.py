@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# "always" pings on every checkout, "idle" only when the connection sat in
+# the pool longer than DB_POOL_PRE_PING_IDLE seconds, "never" skips it.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle").lower()
+POOL_PRE_PING_IDLE = float(os.getenv("DB_POOL_PRE_PING_IDLE", "30"))
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.pings = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connections = {}
+
+    def observe_wait(self, seconds: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+class _MeteredPool:
+    """Pool mixin that records how long each checkout waited for a slot."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.observe_wait(time.perf_counter() - start)
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    stats = pool_stats
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    stats = async_pool_stats
+
+
+def _stats_for(pool) -> PoolStats:
+    # Pools built outside pool_options() share the sync engine's stats
+    return getattr(pool, "stats", pool_stats)
+
+
+def pool_options(use_async: bool = False) -> dict:
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING == "always",
+        "poolclass": MeteredAsyncQueuePool if use_async else MeteredQueuePool,
+    }
+
+
+def _ping(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+    finally:
+        cursor.close()
+
+
+def instrument_pool(engine):
+    """
+    Counts pool events into the pool class's stats and runs the idle
+    pre-ping. Async engines pass their sync_engine.
+    """
+    pool_stats = _stats_for(engine.pool)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, record):
+        now = time.monotonic()
+        record.info["created_at"] = now
+        record.info["checked_in_at"] = now
+        pool_stats.incr("connects")
+        pool_stats.connections[id(record)] = now
+
+    @event.listens_for(engine, "close")
+    def on_close(dbapi_connection, record):
+        pool_stats.incr("disconnects")
+        pool_stats.connections.pop(id(record), None)
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, record, proxy):
+        pool_stats.incr("checkouts")
+
+        if POOL_PRE_PING != "idle":
+            return
+
+        idle = time.monotonic() - record.info.get("checked_in_at", 0)
+        if idle < POOL_PRE_PING_IDLE:
+            return
+
+        pool_stats.incr("pings")
+        try:
+            _ping(dbapi_connection)
+        except Exception:
+            # The pool discards this connection and retries with a new one
+            raise exc.DisconnectionError()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, record):
+        pool_stats.incr("checkins")
+        record.info["checked_in_at"] = time.monotonic()
+
+
+def pool_snapshot(engine) -> dict:
+    pool = engine.pool
+    pool_stats = _stats_for(pool)
+    now = time.monotonic()
+    ages = [now - created for created in list(pool_stats.connections.values())]
+
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "checkouts_total": pool_stats.checkouts,
+        "checkins_total": pool_stats.checkins,
+        "connects_total": pool_stats.connects,
+        "disconnects_total": pool_stats.disconnects,
+        "pre_ping_strategy": POOL_PRE_PING,
+        "pings_total": pool_stats.pings,
+        "wait_count": pool_stats.wait_count,
+        "wait_seconds_total": round(pool_stats.wait_total, 6),
+        "wait_seconds_max": round(pool_stats.wait_max, 6),
+        "connections": len(ages),
+        "connection_age_seconds_max": round(max(ages), 3) if ages else 0,
+        "connection_age_seconds_avg": round(sum(ages) / len(ages), 3) if ages else 0,
+    }
+
+
+def render_prometheus(snapshot: dict, prefix: str = "db_pool") -> str:
+    lines = []
+
+    for key, value in snapshot.items():
+        if isinstance(value, str):
+            lines.append(f'{prefix}_info{{{key}="{value}"}} 1')
+        else:
+            lines.append(f"{prefix}_{key} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,28 @@
+import os
+
+# Rows fetched per round-trip by scans. Drivers that support server-side
+# cursors (PyMySQL, aiomysql) stream; others fetch in batches of this size.
+SCAN_CHUNK_SIZE = int(os.getenv("DB_SCAN_CHUNK_SIZE", "1000"))
+
+
+def scan(query, chunk_size: int | None = None):
+    """
+    Iterate an ORM query in server-side batches instead of materialising
+    it with .all(). The connection is busy until the scan is exhausted,
+    so run every other query of the request before iterating.
+    """
+    return query.yield_per(chunk_size or SCAN_CHUNK_SIZE)
+
+
+async def scan_async(db, statement, chunk_size: int | None = None):
+    """
+    Async counterpart of scan() for select() statements; works with both
+    AsyncSession and ThreadedAsyncSession. Yields rows.
+    """
+    result = await db.stream(
+        statement.execution_options(yield_per=chunk_size or SCAN_CHUNK_SIZE)
+    )
+
+    async for partition in result.partitions():
+        for row in partition:
+            yield row
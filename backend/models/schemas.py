@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import date
-from typing import List, Optional , Dict
+from typing import List, Optional , Dict, Literal
 
 class LoginRequest(BaseModel):
     email: str
@@ -118,6 +118,17 @@ class ShiftBatchRequest(BaseModel):
     remove: List[int] = []        
     approvals: List[ShiftApprovalRequest] = []
 
+class AssignmentBatchRequest(BaseModel):
+    assign: List[int] = []
+    unassign: List[int] = []
+
+class ReportJobRequest(BaseModel):
+    report: Literal["detailed"] = "detailed"
+    from_date: date
+    to_date: date
+    project_id: Optional[int] = None
+    emp_id: Optional[int] = None
+
 class AvailableEmployee(BaseModel):
     emp_id: int
     emp_name: str
@@ -0,0 +1,102 @@
+import os
+
+os.environ.setdefault("MAIL_PORT", "25")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+import models.database as database
+
+# A single in-memory SQLite database for the whole run, swapped in before
+# the app is imported so every module binds to it
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+database.engine = engine
+database.SessionLocal.configure(bind=engine)
+
+import migrations
+
+migrations.upgrade(engine)
+
+from fastapi.testclient import TestClient
+
+import main
+from api.auth import hash_password
+from models.models import ProjectLead
+
+
+class QueryCounter:
+    """Counts statements sent to the test database inside a with block."""
+
+    def __init__(self):
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    session = database.SessionLocal()
+    try:
+        session.add(ProjectLead(
+            lead_name="Test",
+            lead_lname="Admin",
+            email="admin@example.com",
+            passhash=hash_password("secret"),
+            is_admin=True,
+            is_active=True,
+        ))
+        session.commit()
+    finally:
+        session.close()
+
+    response = client.post(
+        "/auth/login",
+        json={"email": "admin@example.com", "password": "secret"},
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def steady_queries(client):
+    """
+    Statements one GET issues once warm: the request runs once to fill
+    the principal and access caches, then again under the counter.
+    """
+    def run(url, headers, params=None):
+        assert client.get(url, headers=headers, params=params).status_code == 200
+
+        with QueryCounter() as counter:
+            response = client.get(url, headers=headers, params=params)
+        assert response.status_code == 200, response.text
+        return counter.count
+
+    return run
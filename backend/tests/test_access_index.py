@@ -0,0 +1,79 @@
+import itertools
+
+import pytest
+from fastapi import HTTPException
+
+from api.dependencies import check_project_access, get_lead_project_ids
+from models import database
+from models.models import Project, ProjectLead, ProjectLeadAssignment
+from tests.conftest import QueryCounter
+
+_emails = itertools.count()
+
+
+def _other_worker(change):
+    # A write made by another process: same database, but no
+    # invalidate_access_index() call in this one
+    session = database.SessionLocal()
+    try:
+        change(session)
+        session.commit()
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def lead(db):
+    lead = ProjectLead(
+        lead_name="Access",
+        lead_lname="Lead",
+        email=f"access-{next(_emails)}@example.com",
+        passhash="x",
+        is_admin=False,
+    )
+    project = Project(name="Guarded", team_name="Access", is_active=True)
+    db.add_all([lead, project])
+    db.flush()
+    db.add(ProjectLeadAssignment(
+        project_id=project.project_id, lead_id=lead.lead_id
+    ))
+    db.commit()
+    return lead
+
+
+def test_warm_access_check_is_one_primary_key_read(db, lead):
+    project_id = get_lead_project_ids(lead, db)[0]
+    check_project_access(project_id, lead, db)
+
+    with QueryCounter() as counter:
+        check_project_access(project_id, lead, db)
+
+    assert counter.count == 1
+
+
+def test_writes_from_other_workers_are_seen(db, lead):
+    project_id = get_lead_project_ids(lead, db)[0]
+    assert check_project_access(project_id, lead, db).project_id == project_id
+
+    # Bulk delete, as update_project does
+    _other_worker(lambda s: s.query(ProjectLeadAssignment).filter(
+        ProjectLeadAssignment.lead_id == lead.lead_id
+    ).delete())
+    db.rollback()
+    with pytest.raises(HTTPException) as revoked:
+        check_project_access(project_id, lead, db)
+    assert revoked.value.status_code == 403
+
+    # Flushed insert
+    _other_worker(lambda s: s.add(ProjectLeadAssignment(
+        project_id=project_id, lead_id=lead.lead_id
+    )))
+    db.rollback()
+    assert project_id in get_lead_project_ids(lead, db)
+
+    # Flushed update of a project
+    _other_worker(lambda s: setattr(s.get(Project, project_id), "is_active", False))
+    db.rollback()
+    with pytest.raises(HTTPException) as deactivated:
+        check_project_access(project_id, lead, db)
+    assert deactivated.value.status_code == 404
@@ -0,0 +1,74 @@
+import datetime
+import itertools
+
+from models.models import (
+    Employee,
+    Project,
+    ProjectEmployee,
+    ProjectShiftMaster,
+    ShiftAllocation,
+)
+
+_emails = itertools.count()
+
+MONTH = [datetime.date(2024, 3, day) for day in range(1, 32)]
+
+
+def _seed_project(db, name):
+    project = Project(name=name, team_name="Reports", is_active=True)
+    db.add(project)
+    db.flush()
+
+    db.add(ProjectShiftMaster(
+        project_id=project.project_id,
+        shift_code="A",
+        shift_name="Morning",
+        start_time=datetime.time(6),
+        end_time=datetime.time(14),
+        weekday_allowance=100,
+        weekend_allowance=200,
+        effective_from=datetime.date(2024, 1, 1),
+    ))
+    db.commit()
+    return project.project_id
+
+
+def _add_employees(db, project_id, count, days):
+    for _ in range(count):
+        employee = Employee(
+            emp_name="Emp",
+            emp_lname="Loyee",
+            email=f"report-{next(_emails)}@example.com",
+            is_active=True,
+        )
+        db.add(employee)
+        db.flush()
+
+        db.add(ProjectEmployee(project_id=project_id, emp_id=employee.emp_id))
+        for day in days:
+            db.add(ShiftAllocation(
+                emp_id=employee.emp_id,
+                project_id=project_id,
+                shift_code="A",
+                shift_date=day,
+                is_approved=True,
+            ))
+    db.commit()
+
+
+def test_detailed_report_query_count_is_flat(db, admin_headers, steady_queries):
+    project_id = _seed_project(db, "Detailed")
+    url = "/allowances/reports/employee-allowance/detailed"
+    params = {
+        "project_id": project_id,
+        "from_date": MONTH[0].isoformat(),
+        "to_date": MONTH[-1].isoformat(),
+    }
+
+    _add_employees(db, project_id, 1, MONTH[:3])
+    small = steady_queries(url, admin_headers, params)
+
+    _add_employees(db, project_id, 20, MONTH)
+    large = steady_queries(url, admin_headers, params)
+
+    assert large == small
@@ -0,0 +1,71 @@
+import json
+
+from models import database
+from models.models import Employee
+
+
+def _import(client, headers, body, content_type="application/json"):
+    response = client.post(
+        "/employees/bulk",
+        headers={**headers, "Content-Type": content_type},
+        content=body,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _row(emp_id, **extra):
+    return {
+        "emp_id": emp_id,
+        "emp_name": "Imp",
+        "emp_lname": "Orted",
+        "email": f"imp{emp_id}@example.com",
+        "is_experienced": False,
+        **extra,
+    }
+
+
+def test_unknown_reporting_to_fails_only_its_row(client, admin_headers):
+    rows = [_row(9101), _row(9102, reporting_to=987654), _row(9103)]
+
+    report = _import(client, admin_headers, json.dumps(rows))
+
+    assert [r["status"] for r in report["results"]] == [
+        "created", "invalid", "created",
+    ]
+    assert report["results"][1]["detail"].startswith("reporting_to")
+
+    session = database.SessionLocal()
+    try:
+        assert session.get(Employee, 9101) is not None
+        assert session.get(Employee, 9102) is None
+    finally:
+        session.close()
+
+
+def test_invalid_rows_echo_parsed_emp_id(client, admin_headers):
+    rows = [{"emp_id": "9201", "emp_name": "No email"}, {"emp_id": "x"}]
+
+    report = _import(client, admin_headers, json.dumps(rows))
+
+    assert [r["emp_id"] for r in report["results"]] == [9201, None]
+    assert {r["status"] for r in report["results"]} == {"invalid"}
+
+
+def test_truncated_json_keeps_rows_before_the_error(client, admin_headers):
+    body = json.dumps([_row(9301), _row(9302)])[:-20]
+
+    report = _import(client, admin_headers, body)
+
+    assert report["created"] == 1
+    assert report["results"][-1]["detail"].startswith("Unreadable input")
+
+
+def test_non_array_body_is_rejected(client, admin_headers):
+    response = client.post(
+        "/employees/bulk",
+        headers={**admin_headers, "Content-Type": "application/json"},
+        content=json.dumps(_row(9401)),
+    )
+
+    assert response.status_code == 400
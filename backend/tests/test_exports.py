@@ -0,0 +1,141 @@
+import csv
+import datetime
+import io
+import re
+import zipfile
+
+import pytest
+
+from models import database
+from models.models import (
+    Employee,
+    Project,
+    ProjectShiftMaster,
+    ShiftAllocation,
+)
+from utils import export
+
+DAYS = [datetime.date(2023, 11, day) for day in range(1, 11)]
+PARAMS = {"from_date": DAYS[0].isoformat(), "to_date": DAYS[-1].isoformat()}
+
+
+@pytest.fixture(scope="module")
+def project_id():
+    db = database.SessionLocal()
+    try:
+        project = Project(name="Exports", team_name="Reports", is_active=True)
+        db.add(project)
+        db.flush()
+
+        db.add(ProjectShiftMaster(
+            project_id=project.project_id,
+            shift_code="E",
+            shift_name="Evening",
+            start_time=datetime.time(14),
+            end_time=datetime.time(22),
+            weekday_allowance=80,
+            weekend_allowance=160,
+            effective_from=datetime.date(2023, 1, 1),
+            is_active=True,
+        ))
+        for n in range(3):
+            employee = Employee(
+                emp_name="Ex",
+                emp_lname=f"Port{n}",
+                email=f"export-{n}@example.com",
+                is_active=True,
+            )
+            db.add(employee)
+            db.flush()
+            for day in DAYS:
+                db.add(ShiftAllocation(
+                    emp_id=employee.emp_id,
+                    project_id=project.project_id,
+                    shift_code="E",
+                    shift_date=day,
+                    is_approved=True,
+                ))
+        db.commit()
+        return project.project_id
+    finally:
+        db.close()
+
+
+def _csv_rows(response):
+    return list(csv.reader(io.StringIO(response.content.decode("utf-8"))))
+
+
+def test_iter_csv_flushes_every_n_rows(monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_FLUSH_ROWS", 2)
+    rows = [("a", 1), ("b", 2), ("c", 3), ("d", 4), ("e", 5)]
+
+    chunks = list(export.iter_csv(rows))
+
+    assert len(chunks) == 3
+    assert b"".join(chunks).decode().splitlines() == ["a,1", "b,2", "c,3", "d,4", "e,5"]
+
+
+def test_detailed_csv_matches_json(client, admin_headers, project_id):
+    params = {**PARAMS, "project_id": project_id}
+
+    response = client.get(
+        "/allowances/reports/employee-allowance/detailed/export",
+        headers=admin_headers,
+        params=params,
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "allowance-daily-" in response.headers["content-disposition"]
+
+    header, *rows = _csv_rows(response)
+    assert header == [
+        "date", "emp_id", "emp_name", "emp_lname",
+        "project", "shift_code", "type", "allowance",
+    ]
+
+    report = client.get(
+        "/allowances/reports/employee-allowance/detailed",
+        headers=admin_headers,
+        params=params,
+    ).json()
+    assert len(rows) == len(report["daily"]) == 30
+    assert sum(float(r[-1]) for r in rows) == pytest.approx(
+        report["summary"]["total_allowance"]
+    )
+
+
+def test_aggregate_csv_matches_json(client, admin_headers, project_id):
+    response = client.get(
+        "/allowances/reports/employee-allowance/aggregate/export",
+        headers=admin_headers,
+        params=PARAMS,
+    )
+    assert response.status_code == 200, response.text
+
+    header, *rows = _csv_rows(response)
+    report = client.get(
+        "/allowances/reports/employee-allowance/aggregate",
+        headers=admin_headers,
+        params=PARAMS,
+    ).json()
+
+    assert header[3:-3] == [s["shift_code"] for s in report["shifts"]]
+    assert [(int(r[0]), float(r[-1])) for r in rows] == [
+        (r["emp_id"], r["total_allowance"]) for r in report["rows"]
+    ]
+
+
+def test_detailed_xlsx_is_a_complete_workbook(client, admin_headers, project_id):
+    response = client.get(
+        "/allowances/reports/employee-allowance/detailed/export",
+        headers=admin_headers,
+        params={**PARAMS, "project_id": project_id, "format": "xlsx"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == export.MEDIA_TYPES["xlsx"]
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as workbook:
+        sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+
+    # Header plus one row per allocation
+    assert len(re.findall(r"<row ", sheet)) == 31
@@ -0,0 +1,199 @@
+import datetime
+
+import pytest
+from sqlalchemy import select
+
+import api.allowance as allowance
+from api.allowance import _project_report
+from api.ledger import rebuild_all
+from migrations.versions import v0003_allowance_ledger
+from models.models import (
+    AllowanceLedger,
+    AllowanceLedgerLock,
+    Employee,
+    Project,
+    ProjectEmployee,
+    ProjectShiftMaster,
+    ShiftAllocation,
+)
+
+MONTH = datetime.date(2023, 5, 1)
+LAST = datetime.date(2023, 5, 31)
+# Wednesdays, so they classify as holidays rather than weekend days
+HOLIDAY = datetime.date(2023, 5, 10)
+COMPANY_HOLIDAY = datetime.date(2023, 5, 17)
+
+
+@pytest.fixture
+def project(db):
+    project = Project(name="Ledger", team_name="Reports", is_active=True)
+    db.add(project)
+    db.flush()
+
+    db.add(ProjectShiftMaster(
+        project_id=project.project_id,
+        shift_code="A",
+        shift_name="Morning",
+        start_time=datetime.time(6),
+        end_time=datetime.time(14),
+        weekday_allowance=100,
+        weekend_allowance=250,
+        effective_from=datetime.date(2023, 1, 1),
+        is_active=True,
+    ))
+
+    emp_ids = []
+    for n in range(2):
+        employee = Employee(
+            emp_name="Led",
+            emp_lname="Ger",
+            email=f"ledger-{project.project_id}-{n}@example.com",
+            is_active=True,
+        )
+        db.add(employee)
+        db.flush()
+        db.add(ProjectEmployee(project_id=project.project_id, emp_id=employee.emp_id))
+        emp_ids.append(employee.emp_id)
+
+    db.commit()
+    return project.project_id, emp_ids
+
+
+def _report(db, project_id, live):
+    db.expire_all()
+    if live:
+        # No closed months: the whole range is aggregated from allocations
+        original, allowance.closed_months = allowance.closed_months, lambda *a: None
+        try:
+            return _project_report(db, project_id, MONTH, LAST)["rows"]
+        finally:
+            allowance.closed_months = original
+    return _project_report(db, project_id, MONTH, LAST)["rows"]
+
+
+def _assert_ledger_matches_live(db, project_id):
+    ledger = _report(db, project_id, live=False)
+    assert ledger == _report(db, project_id, live=True)
+    return ledger
+
+
+def _apply(client, headers, **payload):
+    response = client.post("/shifts/apply-batch", headers=headers, json=payload)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _allocation_ids(db, project_id, day):
+    return [
+        allocation_id for (allocation_id,) in db.execute(
+            select(ShiftAllocation.allocation_id).where(
+                ShiftAllocation.project_id == project_id,
+                ShiftAllocation.shift_date == day,
+            )
+        )
+    ]
+
+
+def test_ledger_follows_roster_and_holiday_edits(db, client, admin_headers, project):
+    project_id, emp_ids = project
+    days = [MONTH + datetime.timedelta(days=n) for n in range(0, 21)]
+
+    result = _apply(
+        client, admin_headers,
+        project_id=project_id,
+        add=[
+            {"emp_id": emp_id, "shift_code": "A", "shift_date": d.isoformat()}
+            for emp_id in emp_ids for d in days
+        ],
+        approvals=[{"date": d.isoformat(), "is_approved": True} for d in days],
+    )
+    assert {a["status"] for a in result["added"]} == {"inserted"}
+    rows = _assert_ledger_matches_live(db, project_id)
+    assert rows[0]["weekend_shift_count"] == 6
+
+    response = client.post("/holidays/", headers=admin_headers, json={
+        "project_id": project_id,
+        "holiday_date": HOLIDAY.isoformat(),
+        "holiday_name": "Founders' day",
+    })
+    assert response.status_code == 200, response.text
+    holiday_id = response.json()["holiday_id"]
+    rows = _assert_ledger_matches_live(db, project_id)
+    assert rows[0]["holiday_shift_count"] == 1
+
+    response = client.post("/holidays/", headers=admin_headers, json={
+        "holiday_date": COMPANY_HOLIDAY.isoformat(),
+        "holiday_name": "Company day",
+    })
+    assert response.status_code == 200, response.text
+    rows = _assert_ledger_matches_live(db, project_id)
+    assert rows[0]["holiday_shift_count"] == 2
+
+    response = client.delete(f"/holidays/{holiday_id}", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    rows = _assert_ledger_matches_live(db, project_id)
+    assert rows[0]["holiday_shift_count"] == 1
+
+    before = rows[0]["total_allowance"]
+    _apply(
+        client, admin_headers,
+        project_id=project_id,
+        approvals=[{"date": days[1].isoformat(), "is_approved": False}],
+    )
+    rows = _assert_ledger_matches_live(db, project_id)
+    assert rows[0]["total_allowance"] == before - 100
+
+    _apply(
+        client, admin_headers,
+        project_id=project_id,
+        remove=_allocation_ids(db, project_id, days[2]),
+    )
+    rows = _assert_ledger_matches_live(db, project_id)
+    assert rows[0]["total_allowance"] == before - 200
+
+    # Only the edited month's slice was locked
+    locks = db.execute(
+        select(AllowanceLedgerLock.month)
+        .where(AllowanceLedgerLock.project_id == project_id)
+    ).scalars().all()
+    assert locks == [MONTH]
+
+
+def _ledger_rows(db):
+    return sorted(
+        tuple(row) for row in db.execute(select(
+            AllowanceLedger.project_id,
+            AllowanceLedger.month,
+            AllowanceLedger.emp_id,
+            AllowanceLedger.shift_code,
+            AllowanceLedger.day_type,
+            AllowanceLedger.shift_count,
+            AllowanceLedger.total_allowance,
+        ))
+    )
+
+
+def test_migration_backfill_matches_rebuild(db, client, admin_headers, project):
+    project_id, emp_ids = project
+    _apply(
+        client, admin_headers,
+        project_id=project_id,
+        add=[
+            {"emp_id": emp_ids[0], "shift_code": "A", "shift_date": d.isoformat()}
+            for d in (MONTH, HOLIDAY, COMPANY_HOLIDAY, LAST)
+        ],
+        approvals=[
+            {"date": d.isoformat(), "is_approved": True}
+            for d in (MONTH, HOLIDAY, COMPANY_HOLIDAY, LAST)
+        ],
+    )
+
+    rebuild_all(db)
+    db.commit()
+    rebuilt = _ledger_rows(db)
+    assert rebuilt
+
+    v0003_allowance_ledger.backfill(db.connection())
+    db.commit()
+
+    assert _ledger_rows(db) == rebuilt
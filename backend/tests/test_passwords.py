@@ -0,0 +1,29 @@
+import asyncio
+import threading
+
+from utils import passwords
+
+
+def test_async_verify_runs_concurrently():
+    passhash = passwords.hash_password("secret")
+
+    async def verify_all():
+        return await asyncio.gather(
+            passwords.verify_password_async("secret", passhash),
+            passwords.verify_password_async("wrong", passhash),
+            passwords.verify_password_async("secret", passhash),
+        )
+
+    assert asyncio.run(verify_all()) == [True, False, True]
+
+
+def test_login_past_queue_depth_is_rejected(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(passwords, "_slots", threading.BoundedSemaphore(1))
+    passwords._slots.acquire()
+
+    response = client.post(
+        "/auth/login",
+        json={"email": "admin@example.com", "password": "secret"},
+    )
+
+    assert response.status_code == 503
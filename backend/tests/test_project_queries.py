@@ -0,0 +1,44 @@
+import itertools
+
+from models.models import Project, ProjectLead, ProjectLeadAssignment
+
+_emails = itertools.count()
+
+
+def _add_projects(db, count, leads_each):
+    for _ in range(count):
+        project = Project(name="Listed", team_name="Projects", is_active=True)
+        db.add(project)
+        db.flush()
+
+        for _ in range(leads_each):
+            lead = ProjectLead(
+                lead_name="Lead",
+                lead_lname="Er",
+                email=f"lead-{next(_emails)}@example.com",
+                passhash="x",
+            )
+            db.add(lead)
+            db.flush()
+            db.add(ProjectLeadAssignment(
+                project_id=project.project_id, lead_id=lead.lead_id
+            ))
+    db.commit()
+
+
+def test_list_projects_query_count_is_constant(db, admin_headers, steady_queries):
+    _add_projects(db, 2, 1)
+    small = steady_queries("/projects/", admin_headers)
+
+    _add_projects(db, 40, 3)
+    large = steady_queries("/projects/", admin_headers)
+
+    assert large == small
+
+
+def test_list_projects_page_query_count_is_constant(db, admin_headers, steady_queries):
+    _add_projects(db, 5, 2)
+    first = steady_queries("/projects/", admin_headers, {"limit": 1})
+    full = steady_queries("/projects/", admin_headers, {"limit": 50})
+
+    assert full == first
@@ -0,0 +1,63 @@
+import datetime
+
+import pytest
+from sqlalchemy import or_, select
+
+from models.models import (
+    ProjectEmployee,
+    ProjectHoliday,
+    ProjectLeadAssignment,
+    ProjectShiftMaster,
+    ShiftAllocation,
+)
+
+FROM = datetime.date(2024, 1, 1)
+TO = datetime.date(2024, 1, 31)
+
+# The filters behind /shifts/weekly, the allowance reports and the access
+# checks, each of which must be served by an index rather than a table scan
+HOT_QUERIES = {
+    "allocations by project and date": select(ShiftAllocation).where(
+        ShiftAllocation.project_id == 1,
+        ShiftAllocation.shift_date.between(FROM, TO),
+    ),
+    "holidays by date": select(ProjectHoliday).where(
+        ProjectHoliday.holiday_date.between(FROM, TO),
+        or_(
+            ProjectHoliday.project_id.is_(None),
+            ProjectHoliday.project_id == 1,
+        ),
+    ),
+    "shift masters by project and code": select(ProjectShiftMaster).where(
+        ProjectShiftMaster.project_id.in_([1, 2]),
+        ProjectShiftMaster.shift_code == "A",
+        ProjectShiftMaster.effective_from <= TO,
+    ),
+    "project employees by project": select(ProjectEmployee).where(
+        ProjectEmployee.project_id == 1,
+    ),
+    "projects by employee": select(ProjectEmployee.project_id).where(
+        ProjectEmployee.emp_id == 1,
+    ),
+    "lead assignment check": select(ProjectLeadAssignment.id).where(
+        ProjectLeadAssignment.project_id == 1,
+        ProjectLeadAssignment.lead_id == 1,
+    ),
+    "projects by lead": select(ProjectLeadAssignment.project_id).where(
+        ProjectLeadAssignment.lead_id == 1,
+    ),
+}
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_an_index(db, name):
+    sql = str(HOT_QUERIES[name].compile(
+        dialect=db.bind.dialect,
+        compile_kwargs={"literal_binds": True},
+    ))
+    plan = [row[-1] for row in db.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {sql}"
+    )]
+
+    scans = [step for step in plan if step.startswith("SCAN")]
+    assert not scans, f"{name} scans a table: {plan}"
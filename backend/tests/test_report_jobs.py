@@ -0,0 +1,175 @@
+import datetime
+import threading
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from models import database
+from models.models import (
+    Employee,
+    Project,
+    ProjectLead,
+    ReportJob,
+    ReportJobChunk,
+    ProjectShiftMaster,
+    ShiftAllocation,
+)
+from utils import jobs
+
+DAYS = [datetime.date(2023, 7, day) for day in range(1, 15)]
+
+
+@pytest.fixture
+def project_id(db):
+    project = Project(name="Jobs", team_name="Reports", is_active=True)
+    db.add(project)
+    db.flush()
+
+    db.add(ProjectShiftMaster(
+        project_id=project.project_id,
+        shift_code="N",
+        shift_name="Night",
+        start_time=datetime.time(22),
+        end_time=datetime.time(6),
+        weekday_allowance=150,
+        weekend_allowance=300,
+        effective_from=datetime.date(2023, 1, 1),
+        is_active=True,
+    ))
+    for n in range(3):
+        employee = Employee(
+            emp_name="Job",
+            emp_lname=f"Runner{n}",
+            email=f"jobs-{project.project_id}-{n}@example.com",
+            is_active=True,
+        )
+        db.add(employee)
+        db.flush()
+        for day in DAYS:
+            db.add(ShiftAllocation(
+                emp_id=employee.emp_id,
+                project_id=project.project_id,
+                shift_code="N",
+                shift_date=day,
+                is_approved=True,
+            ))
+    db.commit()
+    return project.project_id
+
+
+@pytest.fixture
+def admin_id(admin_headers, db):
+    return db.scalar(
+        select(ProjectLead.lead_id).where(ProjectLead.email == "admin@example.com")
+    )
+
+
+def _wait_for(manager, job_id):
+    # The test database is one shared connection, so wait on the manager
+    # rather than polling the table while the worker writes to it
+    for _ in range(500):
+        with manager._lock:
+            if job_id not in manager._pending:
+                return
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still pending")
+
+
+def test_job_result_round_trips_in_chunks(client, admin_headers, project_id, monkeypatch):
+    monkeypatch.setattr(jobs, "REPORT_JOB_CHUNK_SIZE", 256)
+    params = {
+        "project_id": project_id,
+        "from_date": DAYS[0].isoformat(),
+        "to_date": DAYS[-1].isoformat(),
+    }
+
+    response = client.post("/allowances/reports/jobs", headers=admin_headers, json=params)
+    assert response.status_code == 202, response.text
+    job_id = response.json()["job_id"]
+
+    _wait_for(jobs.report_jobs, job_id)
+    job = client.get(f"/allowances/reports/jobs/{job_id}", headers=admin_headers).json()
+    assert job["status"] == jobs.DONE
+    assert job["progress"] == 1.0
+
+    result = client.get(f"/allowances/reports/jobs/{job_id}/result", headers=admin_headers)
+    assert result.status_code == 200
+    expected = client.get(
+        "/allowances/reports/employee-allowance/detailed",
+        headers=admin_headers,
+        params=params,
+    )
+    assert result.json() == expected.json()
+
+    session = database.SessionLocal()
+    try:
+        chunks = session.scalar(
+            select(func.count()).where(ReportJobChunk.job_id == job_id)
+        )
+    finally:
+        session.close()
+    assert chunks > 1
+
+
+def test_failed_job_result_is_reported_not_raised(client, admin_headers, admin_id):
+    def explode(job):
+        raise ValueError("no data for that range")
+
+    job_id = jobs.report_jobs.submit(admin_id, "detailed", {}, explode)["job_id"]
+    _wait_for(jobs.report_jobs, job_id)
+
+    response = client.get(
+        f"/allowances/reports/jobs/{job_id}/result", headers=admin_headers
+    )
+
+    assert response.status_code == 200
+    assert response.json()["status"] == jobs.FAILED
+    assert response.json()["error"] == "no data for that range"
+
+
+def test_queued_jobs_heartbeat_on_a_timer(admin_id, monkeypatch):
+    monkeypatch.setattr(jobs, "REPORT_JOB_WORKERS", 1)
+    monkeypatch.setattr(jobs, "REPORT_JOB_HEARTBEAT", 0.5)
+    manager = jobs.JobManager("heartbeat-test")
+    started = threading.Event()
+    release = threading.Event()
+    beats = threading.Semaphore(0)
+
+    heartbeat = manager._heartbeat
+
+    def counted_heartbeat():
+        heartbeat()
+        beats.release()
+
+    monkeypatch.setattr(manager, "_heartbeat", counted_heartbeat)
+
+    def blocked(job):
+        job.report_progress(3, 10)
+        started.set()
+        release.wait(10)
+        return {}
+
+    try:
+        running = manager.submit(admin_id, "detailed", {}, blocked)
+        assert started.wait(5)
+        queued = manager.submit(admin_id, "detailed", {}, lambda job: {})
+
+        # Two beats with no progress call in between; read right after
+        # the second, while the timer sleeps
+        assert beats.acquire(timeout=5) and beats.acquire(timeout=5)
+
+        session = database.SessionLocal()
+        try:
+            running_row = session.get(ReportJob, running["job_id"])
+            queued_row = session.get(ReportJob, queued["job_id"])
+            assert queued_row.status == jobs.QUEUED
+            assert queued_row.heartbeat_at > queued_row.created_at
+            assert (running_row.processed, running_row.total) == (3, 10)
+        finally:
+            session.close()
+    finally:
+        release.set()
+        for job_id in list(manager._pending):
+            _wait_for(manager, job_id)
+        manager.shutdown()
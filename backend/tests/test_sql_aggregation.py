@@ -0,0 +1,156 @@
+import datetime
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import mssql
+
+import api.allowance as allowance
+from api.allowance import _aggregate_report, _is_weekend_sql, _project_report
+from api.ledger import refresh_ledger
+from models import database
+from models.models import (
+    Employee,
+    Project,
+    ProjectHoliday,
+    ProjectShiftMaster,
+    ShiftAllocation,
+)
+
+FIRST = datetime.date(2023, 9, 1)
+LAST = datetime.date(2023, 9, 30)
+SEPTEMBER = [FIRST + datetime.timedelta(days=n) for n in range(30)]
+
+
+def _shift(project_id, weekday, weekend, effective_from, effective_to=None):
+    return ProjectShiftMaster(
+        project_id=project_id,
+        shift_code="A",
+        shift_name="Morning",
+        start_time=datetime.time(6),
+        end_time=datetime.time(14),
+        weekday_allowance=weekday,
+        weekend_allowance=weekend,
+        effective_from=effective_from,
+        effective_to=effective_to,
+        is_active=True,
+    )
+
+
+@pytest.fixture(scope="module")
+def projects():
+    db = database.SessionLocal()
+    try:
+        alpha = Project(name="Alpha", team_name="Aggregation", is_active=True)
+        beta = Project(name="Beta", team_name="Aggregation", is_active=True)
+        db.add_all([alpha, beta])
+        db.flush()
+
+        # A rate change mid-month, and a second project pricing the same
+        # code differently for the cross-project dedup
+        db.add_all([
+            _shift(alpha.project_id, 100, 200, datetime.date(2023, 1, 1),
+                   datetime.date(2023, 9, 14)),
+            _shift(alpha.project_id, 120, 260, datetime.date(2023, 9, 15)),
+            _shift(beta.project_id, 150, 180, datetime.date(2023, 1, 1)),
+            ProjectHoliday(project_id=None, holiday_date=datetime.date(2023, 9, 13),
+                           holiday_name="Company day", spl_allowance=0),
+            ProjectHoliday(project_id=alpha.project_id,
+                           holiday_date=datetime.date(2023, 9, 20),
+                           holiday_name="Alpha day", spl_allowance=0),
+            # A Saturday: weekend wins over holiday
+            ProjectHoliday(project_id=None, holiday_date=datetime.date(2023, 9, 16),
+                           holiday_name="Weekend holiday", spl_allowance=0),
+        ])
+
+        employees = [
+            Employee(emp_name="Agg", emp_lname=f"Emp{n}",
+                     email=f"aggregation-{n}@example.com", is_active=True)
+            for n in range(2)
+        ]
+        db.add_all(employees)
+        db.flush()
+        shared, alpha_only = employees
+
+        for day in SEPTEMBER:
+            db.add(ShiftAllocation(
+                emp_id=alpha_only.emp_id, project_id=alpha.project_id,
+                shift_code="A", shift_date=day, is_approved=day.day != 25,
+            ))
+        for day, project in itertools.product(
+            SEPTEMBER[::2], (alpha, beta)
+        ):
+            db.add(ShiftAllocation(
+                emp_id=shared.emp_id, project_id=project.project_id,
+                shift_code="A", shift_date=day, is_approved=True,
+            ))
+
+        refresh_ledger(db, [
+            (alpha.project_id, FIRST), (beta.project_id, FIRST),
+        ])
+        db.commit()
+        return alpha.project_id, beta.project_id
+    finally:
+        db.close()
+
+
+def _by_emp(rows):
+    return sorted(rows, key=lambda r: r["emp_id"])
+
+
+def test_project_report_modes_agree(db, projects, monkeypatch):
+    for project_id in projects:
+        from_ledger = _project_report(db, project_id, FIRST, LAST)["rows"]
+
+        with monkeypatch.context() as m:
+            m.setattr(allowance, "closed_months", lambda *a: None)
+            python = _project_report(db, project_id, FIRST, LAST, "python")["rows"]
+            sql = _project_report(db, project_id, FIRST, LAST, "sql")["rows"]
+
+        assert python
+        assert _by_emp(sql) == _by_emp(python) == _by_emp(from_ledger)
+
+
+def test_aggregate_modes_agree_with_cross_project_dedup(db, projects):
+    _, python = _aggregate_report(db, list(projects), FIRST, LAST, "python")
+    _, sql = _aggregate_report(db, list(projects), FIRST, LAST, "sql")
+
+    assert _by_emp(sql) == _by_emp(python)
+
+    # Shared employee: every other day from the 1st, 15 days, each
+    # counted once at the better of the two projects' rates
+    shared = _by_emp(python)[0]
+    assert sum(shared["shift_counts"].values()) + shared["weekend_shift_count"] \
+        + shared["holiday_shift_count"] == 15
+
+
+class _Bind:
+    def __init__(self, name):
+        self.dialect = SimpleNamespace(name=name)
+
+    def get_bind(self):
+        return self
+
+
+def _mssql_weekday(day, datefirst):
+    # DATEPART(weekday, d) under SET DATEFIRST n: 1 is day n, where
+    # Monday is 1 and Sunday 7
+    return (day.isoweekday() - datefirst) % 7 + 1
+
+
+def test_mssql_weekend_expression_ignores_datefirst():
+    expr = _is_weekend_sql(_Bind("mssql"), ShiftAllocation.shift_date)
+    sql = str(expr.compile(
+        dialect=mssql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+
+    assert sql == (
+        "(datepart(weekday, shift_allocation.shift_date) + @@DATEFIRST)"
+        " % 7 IN (0, 1)"
+    )
+
+    # That expression, evaluated for every DATEFIRST setting
+    for datefirst in range(1, 8):
+        for day in SEPTEMBER[:7]:
+            is_weekend = (_mssql_weekday(day, datefirst) + datefirst) % 7 in (0, 1)
+            assert is_weekend == (day.weekday() >= 5), (datefirst, day)
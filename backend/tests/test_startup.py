@@ -0,0 +1,39 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from utils.startup_profile import profile_imports
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+# Loaded on first send / first hash, never while a worker boots
+DEFERRED = ["smtplib", "passlib.context"]
+
+# Cold imports are noisy; the fastest of a few runs is the stable figure
+RUNS = 3
+
+
+@pytest.fixture(scope="module")
+def import_timings():
+    cwd = os.getcwd()
+    os.chdir(BACKEND)
+    try:
+        return [profile_imports() for _ in range(RUNS)]
+    finally:
+        os.chdir(cwd)
+
+
+def test_import_main_within_budget(import_timings):
+    budget_ms = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+    total_ms = min(
+        next(c for name, _, c in timings if name == "main")
+        for timings in import_timings
+    ) / 1000
+
+    assert total_ms <= budget_ms
+
+
+@pytest.mark.parametrize("module", DEFERRED)
+def test_heavy_module_not_imported_at_startup(import_timings, module):
+    assert module not in {name for name, _, _ in import_timings[0]}
@@ -0,0 +1,28 @@
+from sqlalchemy import event
+
+from models.models import Project
+from models import database
+
+
+def test_weekly_roster_uses_one_connection(client, db, admin_headers):
+    project = Project(name="Roster", team_name="Roster", is_active=True)
+    db.add(project)
+    db.commit()
+
+    params = {
+        "project_id": project.project_id,
+        "from_date": "2024-01-01",
+        "to_date": "2024-01-07",
+    }
+    assert client.get("/shifts/weekly", params=params, headers=admin_headers).status_code == 200
+
+    checkouts = []
+    listener = lambda *args: checkouts.append(args)
+    event.listen(database.engine, "checkout", listener)
+    try:
+        response = client.get("/shifts/weekly", params=params, headers=admin_headers)
+    finally:
+        event.remove(database.engine, "checkout", listener)
+
+    assert response.status_code == 200
+    assert len(checkouts) == 1
@@ -0,0 +1,148 @@
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+
+WEEKDAY = "Weekday"
+WEEKEND = "Weekend"
+HOLIDAY = "Holiday"
+
+
+def classify_dates(from_date: date, to_date: date, holidays) -> dict:
+    """
+    Day type for every calendar day in the range, computed once per day
+    instead of once per allocation. Weekends take precedence over holidays.
+    `holidays` holds ISO date strings, as returned by get_holidays_map.
+    """
+    day_types = {}
+    day = from_date
+
+    while day <= to_date:
+        if day.weekday() >= 5:
+            day_types[day] = WEEKEND
+        elif day.isoformat() in holidays:
+            day_types[day] = HOLIDAY
+        else:
+            day_types[day] = WEEKDAY
+        day += timedelta(days=1)
+
+    return day_types
+
+
+def iter_classified(rows, day_types: dict, resolve_shift, dedup: bool = False):
+    """
+    Yield (row, day_type, shift) for each allocation row that resolves to a
+    shift master. Rows are (emp_id, emp_name, emp_lname, shift_code,
+    shift_date, project_id).
+
+    With dedup, an employee working the same code on the same date in
+    several projects counts once, at the highest rate. Dedup expects rows
+    ordered by shift_date and only buffers one day at a time.
+    """
+    if not dedup:
+        for row in rows:
+            shift = resolve_shift(row[5], row[3], row[4])
+            if shift:
+                yield row, day_types[row[4]], shift
+        return
+
+    current_date = None
+    best = {}
+
+    for row in rows:
+        emp_id, _, _, shift_code, shift_date, project_id = row
+
+        if shift_date != current_date:
+            yield from best.values()
+            best.clear()
+            current_date = shift_date
+
+        shift = resolve_shift(project_id, shift_code, shift_date)
+        if not shift:
+            continue
+
+        day_type = day_types[shift_date]
+        unique_key = (emp_id, shift_code)
+        existing = best.get(unique_key)
+
+        if (
+            existing is None
+            or shift_rate(shift, day_type) > shift_rate(existing[2], day_type)
+        ):
+            best[unique_key] = (row, day_type, shift)
+
+    yield from best.values()
+
+
+def shift_rate(shift, day_type: str) -> Decimal:
+    if day_type == WEEKDAY:
+        return shift.weekday_allowance
+    return shift.weekend_allowance
+
+
+def allowance_groups(rows, day_types: dict, resolve_shift, dedup: bool = False):
+    """
+    Group allocations by (emp_id, shift_code, day_type, shift) and reduce
+    each group to a count; totals are count x rate per group.
+    Returns (names, groups) for build_employee_rows, names in first-seen
+    order.
+    """
+    names = {}
+    counts = Counter()
+
+    for row, day_type, shift in iter_classified(rows, day_types, resolve_shift, dedup):
+        emp_id, emp_name, emp_lname, shift_code = row[:4]
+        names.setdefault(emp_id, (emp_name, emp_lname))
+        counts[(emp_id, shift_code, day_type, shift)] += 1
+
+    groups = [
+        (emp_id, shift_code, day_type, count, shift_rate(shift, day_type) * count)
+        for (emp_id, shift_code, day_type, shift), count in counts.items()
+    ]
+    return names, groups
+
+
+def tally_allowances(rows, day_types: dict, resolve_shift, dedup: bool = False):
+    """Per-employee report rows for a stream of allocations."""
+    return build_employee_rows(
+        *allowance_groups(rows, day_types, resolve_shift, dedup)
+    )
+
+
+def build_employee_rows(names: dict, groups) -> list:
+    """
+    Fold (emp_id, shift_code, day_type, count, total) groups into report
+    rows. Weekday shifts are counted per code; weekend and holiday shifts
+    are counted in aggregate.
+    """
+    totals = {emp_id: Decimal(0) for emp_id in names}
+    report = {
+        emp_id: {
+            "emp_id": emp_id,
+            "emp_name": emp_name,
+            "emp_lname": emp_lname,
+            "shift_counts": {},
+            "weekend_shift_count": 0,
+            "holiday_shift_count": 0,
+            "total_allowance": 0,
+        }
+        for emp_id, (emp_name, emp_lname) in names.items()
+    }
+
+    for emp_id, shift_code, day_type, count, total in groups:
+        emp = report[emp_id]
+
+        if day_type == WEEKEND:
+            emp["weekend_shift_count"] += count
+        elif day_type == HOLIDAY:
+            emp["holiday_shift_count"] += count
+        else:
+            emp["shift_counts"][shift_code] = (
+                emp["shift_counts"].get(shift_code, 0) + count
+            )
+
+        totals[emp_id] += total or 0
+
+    for emp_id, total in totals.items():
+        report[emp_id]["total_allowance"] = float(total)
+
+    return list(report.values())
@@ -1,27 +1,49 @@
 import os
-import smtplib
-from email.mime.text import MIMEText
 from dotenv import load_dotenv
 
 load_dotenv()
 
-MAIL_HOST = os.getenv("MAIL_HOST")
-MAIL_PORT = int(os.getenv("MAIL_PORT"))
-MAIL_USERNAME = os.getenv("MAIL_USERNAME")
-MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
-MAIL_FROM = os.getenv("MAIL_FROM")
+
+def _mail_settings():
+    # Read on first send so importing this module needs no mail config
+    return {
+        "host": os.getenv("MAIL_HOST"),
+        "port": int(os.getenv("MAIL_PORT", "587")),
+        "username": os.getenv("MAIL_USERNAME"),
+        "password": os.getenv("MAIL_PASSWORD"),
+        "sender": os.getenv("MAIL_FROM"),
+        "starttls": os.getenv("MAIL_STARTTLS", "true").lower() == "true",
+    }
+
+
+def build_message(sender: str, recipient: str, subject: str, body: str):
+    from email.mime.text import MIMEText
+
+    msg = MIMEText(body)
+    msg["Subject"] = subject
+    msg["From"] = sender
+    msg["To"] = recipient
+    return msg
+
+
+def open_smtp(settings: dict):
+    import smtplib
+
+    server = smtplib.SMTP(settings["host"], settings["port"], timeout=30)
+    if settings["starttls"]:
+        server.starttls()
+    if settings["username"]:
+        server.login(settings["username"], settings["password"])
+    return server
+
 
 def send_email(recipient: str, subject: str, body: str):
     try:
-        msg = MIMEText(body)
-        msg["Subject"] = subject
-        msg["From"] = MAIL_FROM
-        msg["To"] = recipient
-
-        with smtplib.SMTP(MAIL_HOST, MAIL_PORT) as server:
-            server.starttls()
-            server.login(MAIL_USERNAME, MAIL_PASSWORD)
-            server.sendmail(MAIL_FROM, recipient, msg.as_string())
+        settings = _mail_settings()
+        msg = build_message(settings["sender"], recipient, subject, body)
+
+        with open_smtp(settings) as server:
+            server.sendmail(settings["sender"], recipient, msg.as_string())
 
         return True
     except Exception as e:
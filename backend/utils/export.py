@@ -0,0 +1,81 @@
+import csv
+import io
+import os
+import tempfile
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+EXPORT_FLUSH_ROWS = int(os.getenv("EXPORT_FLUSH_ROWS", "500"))
+EXPORT_READ_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def iter_csv(rows):
+    """Encode rows as CSV, yielding a chunk every EXPORT_FLUSH_ROWS rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+
+        if i % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_xlsx(rows, sheet_name: str = "Report"):
+    """
+    Write rows to an XLSX workbook in constant_memory mode, which flushes
+    each row to a temp file as soon as the next one starts, then stream
+    the finished file. The zip container is only readable once complete,
+    so nothing is sent until the last row is written.
+    """
+    import xlsxwriter
+
+    with tempfile.TemporaryFile() as out:
+        workbook = xlsxwriter.Workbook(
+            out, {"constant_memory": True, "in_memory": False}
+        )
+        sheet = workbook.add_worksheet(sheet_name)
+
+        for i, row in enumerate(rows):
+            sheet.write_row(i, 0, row)
+
+        workbook.close()
+        out.seek(0)
+
+        while chunk := out.read(EXPORT_READ_BYTES):
+            yield chunk
+
+
+def export_response(format: str, filename: str, rows) -> StreamingResponse:
+    """
+    StreamingResponse for an export. `rows` yields the header row first
+    and is consumed lazily while the response is sent, so it must own any
+    database session it reads from.
+    """
+    if format == "xlsx":
+        try:
+            import xlsxwriter  # noqa: F401
+        except ImportError:
+            raise HTTPException(501, "XLSX export is not available")
+
+        body = iter_xlsx(rows)
+    else:
+        body = iter_csv(rows)
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{format}"'
+        },
+    )
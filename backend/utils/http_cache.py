@@ -0,0 +1,38 @@
+import hashlib
+import json
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over JSON-serialisable parts (payloads or fingerprints)."""
+    digest = hashlib.sha1(
+        json.dumps(parts, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def request_etag(request: Request, *parts) -> str:
+    """ETag scoped to the request path and query string."""
+    return make_etag(
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        *parts,
+    )
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    # Weak comparison: W/ prefixes are ignored on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,411 @@
+import datetime
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, func, insert, select, update
+
+from models.database import SessionLocal
+from models.models import ReportJob, ReportJobChunk
+
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+REPORT_JOB_CAPACITY = int(os.getenv("REPORT_JOB_CAPACITY", "16"))
+REPORT_JOB_RETENTION = float(os.getenv("REPORT_JOB_RETENTION", "3600"))
+REPORT_JOB_MAX_RETAINED = int(os.getenv("REPORT_JOB_MAX_RETAINED", "200"))
+# Seconds between progress/heartbeat writes while jobs are pending
+REPORT_JOB_HEARTBEAT = float(os.getenv("REPORT_JOB_HEARTBEAT", "5"))
+# Characters per stored result chunk. json.dumps escapes to ASCII, so
+# this is also the byte size each INSERT sends.
+REPORT_JOB_CHUNK_SIZE = int(os.getenv("REPORT_JOB_CHUNK_SIZE", str(1024 * 1024)))
+# A pending job whose heartbeat is older than this lost its worker
+REPORT_JOB_STALE_AFTER = float(os.getenv("REPORT_JOB_STALE_AFTER", "600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+PENDING = (QUEUED, RUNNING)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.utcnow()
+
+
+def snapshot(job: ReportJob) -> dict:
+    progress = None
+    if job.status == DONE:
+        progress = 1.0
+    elif job.total:
+        progress = round(min(job.processed / job.total, 1.0), 4)
+
+    return {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "params": json.loads(job.params),
+        "status": job.status,
+        "progress": progress,
+        "processed": job.processed,
+        "total": job.total,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class Job:
+    """
+    Handle passed to the job function. Progress is kept in memory; the
+    manager's heartbeat thread writes it through.
+    """
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.done = 0
+        self.total = None
+
+    def report_progress(self, done: int, total: int | None = None):
+        self.done = done
+        if total is not None:
+            self.total = total
+
+
+class JobManager:
+    """
+    Runs long reports on a small thread pool of their own, so they neither
+    tie up the request threadpool nor run unbounded. Job state and results
+    live in the report_job table, so any worker can serve status and
+    downloads and REPORT_JOB_CAPACITY holds across workers. Finished jobs
+    are kept for REPORT_JOB_RETENTION seconds.
+
+    A timer thread heartbeats every job this worker accepted, queued or
+    running, every REPORT_JOB_HEARTBEAT seconds; pending jobs whose
+    heartbeat goes stale (worker killed or restarted) are marked failed.
+    Results are stored in REPORT_JOB_CHUNK_SIZE slices.
+    """
+
+    def __init__(self, name: str = "report-job"):
+        self._name = name
+        self._pending = set()
+        self._running = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stop = threading.Event()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=REPORT_JOB_WORKERS,
+                    thread_name_prefix=self._name,
+                )
+                self._stop.clear()
+                threading.Thread(
+                    target=self._heartbeat_loop,
+                    name=f"{self._name}-heartbeat",
+                    daemon=True,
+                ).start()
+            return self._executor
+
+    def submit(self, owner, kind: str, params: dict, fn, *args) -> dict:
+        """
+        Queue fn(job, *args); its return value becomes the job result.
+        Raises JobQueueFull when REPORT_JOB_CAPACITY jobs are pending.
+        The capacity check is a count, not a reservation, so concurrent
+        submits on different workers may overshoot it by a few jobs.
+        """
+        now = _now()
+        db = SessionLocal()
+        try:
+            self._expire(db)
+
+            active = (
+                db.query(func.count(ReportJob.job_id))
+                .filter(ReportJob.status.in_(PENDING))
+                .scalar()
+            )
+            if active >= REPORT_JOB_CAPACITY:
+                db.commit()
+                raise JobQueueFull()
+
+            job = ReportJob(
+                job_id=uuid.uuid4().hex,
+                owner_id=owner,
+                kind=kind,
+                params=json.dumps(params),
+                status=QUEUED,
+                processed=0,
+                created_at=now,
+                heartbeat_at=now,
+            )
+            db.add(job)
+            db.commit()
+            result = snapshot(job)
+        finally:
+            db.close()
+
+        with self._lock:
+            self._pending.add(result["job_id"])
+
+        self._get_executor().submit(self._run, result["job_id"], fn, args)
+        return result
+
+    def get(self, job_id: str, owner) -> dict | None:
+        """Snapshot of the job if it exists and belongs to owner."""
+        db = SessionLocal()
+        try:
+            self._expire(db)
+            db.commit()
+
+            job = self._owned(db, job_id, owner)
+            return snapshot(job) if job is not None else None
+        finally:
+            db.close()
+
+    def iter_result(self, job_id: str):
+        """
+        The finished job's JSON, chunk by chunk, one primary key read
+        each. Check ownership and status with get() first.
+        """
+        db = SessionLocal()
+        try:
+            seq = 0
+            while True:
+                data = db.scalar(
+                    select(ReportJobChunk.data).where(
+                        ReportJobChunk.job_id == job_id,
+                        ReportJobChunk.seq == seq,
+                    )
+                )
+                if data is None:
+                    return
+                yield data
+                seq += 1
+        finally:
+            db.close()
+
+    def list(self, owner) -> list[dict]:
+        db = SessionLocal()
+        try:
+            self._expire(db)
+            self._prune(db)
+            db.commit()
+
+            jobs = (
+                db.query(ReportJob)
+                .filter(ReportJob.owner_id == owner)
+                .order_by(ReportJob.created_at.desc())
+                .all()
+            )
+            return [snapshot(job) for job in jobs]
+        finally:
+            db.close()
+
+    def _owned(self, db, job_id: str, owner) -> ReportJob | None:
+        job = db.get(ReportJob, job_id)
+        if job is None or job.owner_id != owner:
+            return None
+        return job
+
+    def _update(self, job_id: str, *criteria, **values) -> bool:
+        db = SessionLocal()
+        try:
+            matched = db.execute(
+                update(ReportJob)
+                .where(ReportJob.job_id == job_id, *criteria)
+                .values(**values)
+            ).rowcount
+            db.commit()
+            return matched > 0
+        finally:
+            db.close()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(REPORT_JOB_HEARTBEAT):
+            self._heartbeat()
+
+    def _heartbeat(self) -> None:
+        # Queued jobs too, so they are not expired while they wait behind
+        # a long report
+        now = _now()
+        with self._lock:
+            pending = list(self._pending)
+            running = list(self._running.values())
+
+        if not pending:
+            return
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(ReportJob)
+                .where(
+                    ReportJob.job_id.in_(pending),
+                    ReportJob.status.in_(PENDING),
+                )
+                .values(heartbeat_at=now)
+            )
+            for job in running:
+                db.execute(
+                    update(ReportJob)
+                    .where(ReportJob.job_id == job.id)
+                    .values(processed=job.done, total=job.total)
+                )
+            db.commit()
+        except Exception as e:
+            # Best effort; the next beat or the final update catches up
+            db.rollback()
+            print("Report job heartbeat failed:", e)
+        finally:
+            db.close()
+
+    def _finish(self, job: Job, body: str) -> None:
+        db = SessionLocal()
+        try:
+            for seq, start in enumerate(range(0, len(body), REPORT_JOB_CHUNK_SIZE)):
+                db.execute(insert(ReportJobChunk).values(
+                    job_id=job.id,
+                    seq=seq,
+                    data=body[start:start + REPORT_JOB_CHUNK_SIZE],
+                ))
+
+            # Committed with the chunks, so readers never see done
+            # without the whole result
+            db.execute(
+                update(ReportJob)
+                .where(ReportJob.job_id == job.id)
+                .values(
+                    status=DONE,
+                    processed=job.total if job.total is not None else job.done,
+                    total=job.total,
+                    finished_at=_now(),
+                )
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run(self, job_id: str, fn, args):
+        job = Job(job_id)
+
+        try:
+            now = _now()
+            started = self._update(
+                job_id, ReportJob.status == QUEUED,
+                status=RUNNING, started_at=now, heartbeat_at=now,
+            )
+            if not started:
+                # Already failed by shutdown or expiry
+                return
+
+            with self._lock:
+                self._running[job_id] = job
+
+            self._finish(job, json.dumps(jsonable_encoder(fn(job, *args))))
+        except Exception as e:
+            print("Report job failed:", job_id, e)
+            try:
+                self._update(
+                    job_id,
+                    status=FAILED,
+                    error=(str(e) or type(e).__name__)[:500],
+                    finished_at=_now(),
+                )
+            except Exception as e:
+                # Left pending; _expire fails it once the heartbeat is stale
+                print("Report job status update failed:", job_id, e)
+        finally:
+            with self._lock:
+                self._pending.discard(job_id)
+                self._running.pop(job_id, None)
+
+    def _expire(self, db) -> None:
+        cutoff = _now() - datetime.timedelta(seconds=REPORT_JOB_STALE_AFTER)
+        db.execute(
+            update(ReportJob)
+            .where(
+                ReportJob.status.in_(PENDING),
+                ReportJob.heartbeat_at < cutoff,
+            )
+            .values(status=FAILED, error="Job lost its worker", finished_at=_now())
+        )
+
+    def _prune(self, db) -> None:
+        cutoff = _now() - datetime.timedelta(seconds=REPORT_JOB_RETENTION)
+        expired = [
+            job_id for (job_id,) in
+            db.query(ReportJob.job_id)
+            .filter(ReportJob.finished_at < cutoff)
+            .all()
+        ]
+
+        overflow = [
+            job_id for (job_id,) in
+            db.query(ReportJob.job_id)
+            .filter(ReportJob.finished_at >= cutoff)
+            .order_by(ReportJob.finished_at.desc())
+            .offset(REPORT_JOB_MAX_RETAINED)
+            .all()
+        ]
+
+        doomed = expired + overflow
+        if doomed:
+            # Chunks first: they reference the job row
+            db.execute(
+                delete(ReportJobChunk).where(ReportJobChunk.job_id.in_(doomed))
+            )
+            db.execute(
+                delete(ReportJob).where(ReportJob.job_id.in_(doomed))
+            )
+
+    def shutdown(self):
+        self._stop.set()
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is None:
+            return
+
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        # Cancelled jobs never reach _run; fail them rather than leave
+        # them queued until their heartbeat goes stale
+        with self._lock:
+            pending = list(self._pending)
+
+        if pending:
+            db = SessionLocal()
+            try:
+                db.execute(
+                    update(ReportJob)
+                    .where(
+                        ReportJob.job_id.in_(pending),
+                        ReportJob.status == QUEUED,
+                    )
+                    .values(
+                        status=FAILED,
+                        error="Server shut down before the job started",
+                        finished_at=_now(),
+                    )
+                )
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print("Report job shutdown update failed:", e)
+            finally:
+                db.close()
+
+
+report_jobs = JobManager()
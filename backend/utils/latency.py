@@ -0,0 +1,57 @@
+import threading
+from collections import deque
+
+WINDOW_SIZE = 2048
+
+
+class LatencyWindow:
+    """Rolling window of the most recent durations, in seconds."""
+
+    def __init__(self, size: int = WINDOW_SIZE):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+
+        if not samples:
+            return {"count": count, "p50_ms": 0, "p95_ms": 0, "p99_ms": 0, "max_ms": 0}
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2)
+
+        return {
+            "count": count,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(samples[-1] * 1000, 2),
+        }
+
+
+# Login is tracked apart from the rest of the API so a bcrypt-heavy login
+# storm shows up on its own instead of skewing every other endpoint.
+LOGIN_PATHS = {"/auth/login", "/auth/employee/login"}
+
+windows = {
+    "login": LatencyWindow(),
+    "api": LatencyWindow(),
+    "password_hash": LatencyWindow(),
+    "password_verify": LatencyWindow(),
+}
+
+
+def request_bucket(path: str) -> str:
+    return "login" if path in LOGIN_PATHS else "api"
+
+
+def latency_summary() -> dict:
+    return {name: window.summary() for name, window in windows.items()}
@@ -0,0 +1,166 @@
+import os
+import queue
+import threading
+import time
+
+from utils.email_utils import _mail_settings, build_message, open_smtp
+
+MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", "1000"))
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "1"))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", "3"))
+MAIL_RETRY_BACKOFF = float(os.getenv("MAIL_RETRY_BACKOFF", "1"))
+MAIL_IDLE_TIMEOUT = float(os.getenv("MAIL_IDLE_TIMEOUT", "60"))
+
+# Queued by stop() to wake workers blocked waiting for mail
+_WAKE = object()
+
+
+class MailDispatcher:
+    """
+    Background sender for outbound mail. Each worker thread keeps one SMTP
+    connection open across messages, drains the queue in batches and
+    closes the connection after MAIL_IDLE_TIMEOUT seconds without work.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=MAIL_QUEUE_SIZE)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+
+            self._stopping.clear()
+            for i in range(MAIL_WORKERS):
+                thread = threading.Thread(
+                    target=self._run, name=f"mail-dispatcher-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 10):
+        with self._lock:
+            threads, self._threads = self._threads, []
+
+        self._stopping.set()
+
+        # Wake idle workers blocked in get(); busy ones see _stopping
+        for _ in threads:
+            try:
+                self._queue.put_nowait(_WAKE)
+            except queue.Full:
+                break
+
+        for thread in threads:
+            thread.join(timeout)
+
+    def enqueue(self, recipient: str, subject: str, body: str) -> bool:
+        """Queue a message; False when the queue is full."""
+        self.start()
+        try:
+            self._queue.put_nowait((recipient, subject, body))
+            return True
+        except queue.Full:
+            return False
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        settings = _mail_settings()
+        server = None
+
+        while not self._stopping.is_set() or not self._queue.empty():
+            try:
+                first = self._queue.get(timeout=1 if server is None else MAIL_IDLE_TIMEOUT)
+            except queue.Empty:
+                server = _close(server)
+                continue
+
+            batch = [first]
+            while len(batch) < MAIL_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for message in batch:
+                if message is not _WAKE:
+                    server = self._deliver(settings, server, *message)
+                self._queue.task_done()
+
+        _close(server)
+
+    def _deliver(self, settings, server, recipient, subject, body):
+        """
+        Send one message, retrying transient failures with backoff. Never
+        raises: an exception here would end the worker thread for good.
+        """
+        import smtplib
+
+        for attempt in range(MAIL_MAX_RETRIES + 1):
+            try:
+                msg = build_message(settings["sender"], recipient, subject, body)
+
+                if server is None:
+                    server = open_smtp(settings)
+
+                server.sendmail(settings["sender"], recipient, msg.as_string())
+                return server
+            except smtplib.SMTPException as e:
+                print("Email Error:", e)
+
+                if _is_permanent(e):
+                    # The server rejected this message; the session is fine
+                    break
+
+                server = _close(server)
+            # Connection failures; SMTPException is handled above
+            except OSError as e:
+                print("Email Error:", e)
+                server = _close(server)
+            except Exception as e:
+                # A message that cannot be encoded or sent will never go
+                # through; the connection may be mid-command, so drop it
+                print("Email Error:", type(e).__name__, e)
+                server = _close(server)
+                break
+
+            if attempt < MAIL_MAX_RETRIES:
+                time.sleep(MAIL_RETRY_BACKOFF * 2 ** attempt)
+
+        print("Email Dropped:", recipient, subject)
+        return server
+
+
+def _is_permanent(error) -> bool:
+    """5xx replies reject the message itself; retrying cannot help."""
+    import smtplib
+
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+
+    return False
+
+
+def _close(server):
+    if server is not None:
+        try:
+            server.quit()
+        except Exception:
+            pass
+    return None
+
+
+mail_dispatcher = MailDispatcher()
+
+
+def enqueue_email(recipient: str, subject: str, body: str) -> bool:
+    return mail_dispatcher.enqueue(recipient, subject, body)
@@ -0,0 +1,143 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from starlette.concurrency import run_in_threadpool
+
+from utils.latency import windows
+
+# Bcrypt runs in worker processes so a login storm does not hold the GIL
+# for the threads serving everything else. PASSWORD_WORKERS=0 hashes
+# inline. PASSWORD_QUEUE_DEPTH caps in-flight operations; beyond that
+# callers get PasswordQueueFull instead of queueing without bound. Sync
+# callers hold a request thread while they wait, so the default stays
+# well below the threadpool's 40 threads; logins await instead.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max((os.cpu_count() or 2) // 2, 1))))
+PASSWORD_QUEUE_DEPTH = int(os.getenv("PASSWORD_QUEUE_DEPTH", "8"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_QUEUE_DEPTH)
+
+
+class PasswordQueueFull(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    # passlib and the bcrypt backend load on first password operation
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify(password: str, passhash: str) -> bool:
+    return get_pwd_context().verify(password, passhash)
+
+
+def _mp_context():
+    # The pool starts lazily, after the mail and job threads exist, and
+    # forking a multi-threaded process can leave children deadlocked on
+    # copied locks. Workers are started from a clean process instead.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _get_executor():
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=PASSWORD_WORKERS,
+                    mp_context=_mp_context(),
+                )
+
+    return _executor
+
+
+def _run(window: str, fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordQueueFull()
+
+    start = time.perf_counter()
+    try:
+        if PASSWORD_WORKERS <= 0:
+            return fn(*args)
+        return _get_executor().submit(fn, *args).result()
+    finally:
+        _slots.release()
+        windows[window].observe(time.perf_counter() - start)
+
+
+async def _run_async(window: str, fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordQueueFull()
+
+    start = time.perf_counter()
+    try:
+        if PASSWORD_WORKERS <= 0:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.wrap_future(_get_executor().submit(fn, *args))
+    finally:
+        _slots.release()
+        windows[window].observe(time.perf_counter() - start)
+
+
+def hash_password(password: str) -> str:
+    return _run("password_hash", _hash, password)
+
+
+def verify_password(password: str, passhash: str) -> bool:
+    return _run("password_verify", _verify, password, passhash)
+
+
+async def verify_password_async(password: str, passhash: str) -> bool:
+    """verify_password for async handlers: awaits the worker instead of
+    holding a request thread."""
+    return await _run_async("password_verify", _verify, password, passhash)
+
+
+def hash_many(passwords: list[str]) -> list[str]:
+    """
+    Hash a batch in parallel. Work is submitted one round at a time,
+    holding a single slot, so logins queued meanwhile wait for at most one
+    round instead of the whole batch.
+    """
+    if PASSWORD_WORKERS <= 0:
+        return [hash_password(p) for p in passwords]
+
+    round_size = PASSWORD_WORKERS * 2
+    hashes = []
+
+    for i in range(0, len(passwords), round_size):
+        if not _slots.acquire(blocking=False):
+            raise PasswordQueueFull()
+
+        start = time.perf_counter()
+        try:
+            hashes.extend(_get_executor().map(_hash, passwords[i:i + round_size]))
+        finally:
+            _slots.release()
+            windows["password_hash"].observe(time.perf_counter() - start)
+
+    return hashes
+
+
+def shutdown():
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,27 @@
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, for handlers that return large
+    payloads of plain dicts, lists, dates and datetimes. Falls back to the
+    standard encoder when orjson is not installed.
+    """
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+        return json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
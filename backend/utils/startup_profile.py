@@ -0,0 +1,51 @@
+"""
+Import-time profile of the app, for checking worker cold start:
+
+    python -m utils.startup_profile [budget_ms]
+
+Imports main in a fresh interpreter with -X importtime, prints the
+slowest modules and exits non-zero when the total exceeds the budget
+(argument or IMPORT_BUDGET_MS, default 1500).
+"""
+import os
+import subprocess
+import sys
+
+TOP = 15
+
+
+def profile_imports(module: str = "main"):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    return timings
+
+
+def main(argv):
+    budget_ms = float(argv[1] if len(argv) > 1 else os.getenv("IMPORT_BUDGET_MS", "1500"))
+    timings = profile_imports()
+
+    total_ms = next(c for name, _, c in timings if name == "main") / 1000
+    print(f"{'module':60} {'self ms':>9} {'cumul ms':>9}")
+
+    for name, self_us, cumulative_us in sorted(timings, key=lambda t: t[1], reverse=True)[:TOP]:
+        print(f"{name:60} {self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}")
+
+    print(f"\nimport main: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    return 0 if total_ms <= budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))